@@ -7,3 +7,7 @@ class ApiConfig(AppConfig):
 
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'api'
+
+    def ready(self):
+        """Подключение сигналов приложения."""
+        import api.signals  # noqa: F401
@@ -1,15 +1,25 @@
 """Представления ingredients."""
 import django_filters
+from django.db.models import Exists, OuterRef
 from django_filters.rest_framework import CharFilter, FilterSet
+from rest_framework.filters import OrderingFilter
 
+from favorite.models import Favorite
 from ingredients.models import Ingredient
 from recipes.models import Recipe
+from recipes.search import search_recipes
+from shopping_cart.models import ShoppingCart
 
 BOOLEAN_CHOICES = (
     ('0', False),
     ('1', True),
 )
 
+USER_LIST_MODELS = {
+    'is_favorited': Favorite,
+    'is_in_shopping_cart': ShoppingCart,
+}
+
 
 class IngredientFilter(FilterSet):
     """Фильтр ингредиентов по названию."""
@@ -29,14 +39,53 @@ class RecipeFilter(django_filters.FilterSet):
     tags = django_filters.AllValuesMultipleFilter(field_name="tags__slug")
     author = django_filters.NumberFilter(field_name="author__id")
     is_in_shopping_cart = django_filters.TypedChoiceFilter(
-        choices=BOOLEAN_CHOICES, coerce=lambda x: x == '1'
+        choices=BOOLEAN_CHOICES, coerce=lambda x: x == '1',
+        method='filter_user_list'
     )
     is_favorited = django_filters.TypedChoiceFilter(
-        choices=BOOLEAN_CHOICES, coerce=lambda x: x == '1'
+        choices=BOOLEAN_CHOICES, coerce=lambda x: x == '1',
+        method='filter_user_list'
     )
+    search = CharFilter(method='filter_search')
 
     class Meta:
         """Мета-информация RecipeFilter."""
 
         model = Recipe
-        fields = ('tags', 'author', 'is_in_shopping_cart', 'is_favorited')
+        fields = (
+            'tags', 'author', 'is_in_shopping_cart', 'is_favorited', 'search'
+        )
+
+    def filter_user_list(self, queryset, name, value):
+        """Рецепты в избранном или списке покупок текущего пользователя.
+
+        Для анонимного пользователя списки пусты.
+        """
+        user = self.request.user
+        if not user.is_authenticated:
+            return queryset.none() if value else queryset
+        in_list = Exists(USER_LIST_MODELS[name].objects.filter(
+            user=user, recipe=OuterRef('id')
+        ))
+        return queryset.filter(in_list if value else ~in_list)
+
+    def filter_search(self, queryset, name, value):
+        """Полнотекстовый поиск по названию, тексту и ингредиентам."""
+        return search_recipes(queryset, value)
+
+
+class RecipeOrderingFilter(OrderingFilter):
+    """Сортировка рецептов с сохранением стабильного порядка.
+
+    К выбранной сортировке добавляется сортировка модели по умолчанию,
+    чтобы рецепты с равными значениями не переставлялись между страницами.
+    """
+
+    def get_ordering(self, request, queryset, view):
+        """Добавление сортировки модели к выбранной пользователем."""
+        ordering = super().get_ordering(request, queryset, view)
+        if not ordering:
+            return ordering
+        return (*ordering, *(
+            field for field in Recipe._meta.ordering if field not in ordering
+        ))
@@ -1,11 +1,158 @@
 """Пагинация API проекта."""
-from rest_framework.pagination import PageNumberPagination
+import base64
+import binascii
 
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from feed.timeline import get_feed
 from foodgram_backend.constants import RECIPE_PAGE_SIZE
 
 
+class RecipeCursorPagination(BasePagination):
+    """Курсорная пагинация рецептов по ключу (date_created, id).
+
+    Страница выбирается условием по ключу последнего показанного рецепта,
+    поэтому не выполняются ни OFFSET, ни подсчет общего количества.
+    """
+
+    cursor_query_param = 'cursor'
+    page_size = RECIPE_PAGE_SIZE
+    page_size_query_param = 'limit'
+    invalid_cursor_message = 'Неверный курсор.'
+    ordering = ('-date_created', '-id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Получение страницы, следующей за позицией курсора."""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        position = self.decode_cursor(
+            request.query_params.get(self.cursor_query_param)
+        )
+        queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            date_created, pk = position
+            queryset = queryset.filter(
+                Q(date_created__lt=date_created)
+                | Q(date_created=date_created, id__lt=pk)
+            )
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        return self.page
+
+    def get_page_size(self, request):
+        """Размер страницы из параметра limit."""
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return page_size if page_size > 0 else self.page_size
+
+    def decode_cursor(self, cursor):
+        """Разбор курсора вида base64('<date_created>|<id>')."""
+        if not cursor:
+            return None
+        try:
+            date_created, pk = base64.urlsafe_b64decode(
+                cursor.encode()
+            ).decode().split('|')
+            date_created = parse_datetime(date_created)
+            pk = int(pk)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if date_created is None:
+            raise NotFound(self.invalid_cursor_message)
+        return date_created, pk
+
+    @staticmethod
+    def encode_cursor(obj):
+        """Курсор, указывающий на позицию переданного рецепта."""
+        return base64.urlsafe_b64encode(
+            f'{obj.date_created.isoformat()}|{obj.pk}'.encode()
+        ).decode()
+
+    def get_next_link(self):
+        """Ссылка на следующую страницу."""
+        if not self.has_next:
+            return None
+        url = remove_query_param(self.request.build_absolute_uri(), 'page')
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.page[-1])
+        )
+
+    def get_paginated_response(self, data):
+        """Ответ без подсчета общего количества объектов."""
+        return Response({'next': self.get_next_link(), 'results': data})
+
+
+class FeedPagination(RecipeCursorPagination):
+    """Курсорная пагинация ленты подписок текущего пользователя.
+
+    Id рецептов страницы берутся из ленты, переданный кверисет
+    используется для получения самих рецептов с аннотациями.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Получение страницы ленты, следующей за позицией курсора."""
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        recipe_ids = get_feed(
+            request.user,
+            self.decode_cursor(
+                request.query_params.get(self.cursor_query_param)
+            ),
+            self.page_size + 1
+        )
+        self.has_next = len(recipe_ids) > self.page_size
+        recipes = queryset.in_bulk(recipe_ids[:self.page_size])
+        self.page = [
+            recipes[pk] for pk in recipe_ids[:self.page_size]
+            if pk in recipes
+        ]
+        return self.page
+
+
 class RecipePagination(PageNumberPagination):
-    """Класс пагинации для рецепта."""
+    """Класс пагинации для рецепта.
+
+    При наличии параметра cursor (в том числе пустого) используется
+    курсорная пагинация, иначе - постраничная с параметрами page и limit.
+    Курсор задает порядок по дате создания, поэтому его нельзя
+    совмещать с сортировкой и поиском по релевантности.
+    """
 
     page_size = RECIPE_PAGE_SIZE
     page_size_query_param = 'limit'
+    cursor_pagination_class = RecipeCursorPagination
+    cursor_conflicting_params = (api_settings.ORDERING_PARAM, 'search')
+    cursor_conflict_message = (
+        'Параметр {} нельзя использовать вместе с параметром cursor.'
+    )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Выбор режима пагинации по параметрам запроса."""
+        self.cursor_paginator = None
+        cursor_paginator = self.cursor_pagination_class()
+        if cursor_paginator.cursor_query_param in request.query_params:
+            for param in self.cursor_conflicting_params:
+                if request.query_params.get(param):
+                    raise ValidationError(
+                        {param: [self.cursor_conflict_message.format(param)]}
+                    )
+            self.cursor_paginator = cursor_paginator
+            return cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        """Ответ в формате выбранного режима пагинации."""
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -0,0 +1,48 @@
+"""Наборы запросов API проекта."""
+from django.db.models import (BooleanField, Count, Exists, OuterRef, Prefetch,
+                              Value)
+
+from recipes.models import Recipe
+from subscriptions.models import Subscription
+
+
+def annotate_is_subscribed(queryset, user):
+    """Аннотация признака подписки пользователя на авторов кверисета.
+
+    Признак вычисляется одним подзапросом для всей страницы, а не
+    отдельным запросом на каждого сериализуемого пользователя.
+    """
+    if user is None or not user.is_authenticated:
+        return queryset.annotate(
+            is_subscribed=Value(False, output_field=BooleanField())
+        )
+    return queryset.annotate(is_subscribed=Exists(
+        Subscription.objects.filter(user_from=user, user_to=OuterRef('id'))
+    ))
+
+
+def get_recipes_limit(request):
+    """Получение ограничения числа рецептов из параметров запроса."""
+    try:
+        recipes_limit = int(request.query_params.get('recipes_limit'))
+    except (TypeError, ValueError):
+        return None
+    return recipes_limit if recipes_limit >= 0 else None
+
+
+def with_author_recipes(queryset, request):
+    """Авторы с числом рецептов и первыми recipes_limit рецептами.
+
+    Рецепты всех авторов страницы загружаются одним оконным запросом,
+    а их количество - аннотацией, поэтому число запросов не зависит
+    от количества авторов.
+    """
+    recipes = Recipe.objects.all()
+    recipes_limit = get_recipes_limit(request)
+    if recipes_limit is not None:
+        recipes = recipes[:recipes_limit]
+    return annotate_is_subscribed(queryset, request.user).annotate(
+        recipes_count=Count('recipes')
+    ).prefetch_related(
+        Prefetch('recipes', queryset=recipes, to_attr='limited_recipes')
+    )
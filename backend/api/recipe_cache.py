@@ -0,0 +1,140 @@
+"""Кеш представлений рецептов.
+
+Представление рецепта собирается из двух слоев. Общий для всех
+пользователей документ кешируется по id рецепта и его версии - дате
+изменения, поэтому изменение рецепта не требует сброса кеша: следующий
+запрос просто не найдет документ новой версии. Признаки избранного,
+списка покупок и подписки на автора берутся из кешируемого набора id
+пользователя, который сбрасывается при изменении его списков и подписок.
+Страницы списка рецептов для анонимных пользователей кешируются целиком
+до изменения любого рецепта.
+"""
+import hashlib
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from api.serializers import RecipeDocumentSerializer
+from counters.store import get_value, increment
+from favorite.models import Favorite
+from foodgram_backend.constants import (RECIPE_DOCUMENT_CACHE_KEY,
+                                        RECIPE_DOCUMENT_CACHE_TIMEOUT,
+                                        RECIPE_LIST_CACHE_KEY,
+                                        RECIPE_LIST_VERSION_KEY,
+                                        RECIPE_OVERLAY_CACHE_KEY,
+                                        RECIPE_OVERLAY_CACHE_TIMEOUT)
+from recipes.models import Recipe
+from shopping_cart.models import ShoppingCart
+from subscriptions.models import Subscription
+
+
+def get_document_key(recipe, request):
+    """Ключ документа рецепта текущей версии.
+
+    В ключ входит адрес сайта, так как документ содержит абсолютные
+    ссылки на изображения.
+    """
+    return RECIPE_DOCUMENT_CACHE_KEY.format(
+        request.build_absolute_uri('/'), recipe.id,
+        recipe.date_updated.timestamp()
+    )
+
+
+def get_overlay(user):
+    """Id рецептов в избранном и списке покупок и id авторов в подписках.
+
+    Для анонимного пользователя возвращает None.
+    """
+    if not user.is_authenticated:
+        return None
+    key = RECIPE_OVERLAY_CACHE_KEY.format(user.id)
+    overlay = cache.get(key)
+    if overlay is None:
+        overlay = (
+            set(Favorite.objects.filter(user=user).values_list(
+                'recipe_id', flat=True
+            )),
+            set(ShoppingCart.objects.filter(user=user).values_list(
+                'recipe_id', flat=True
+            )),
+            set(Subscription.objects.filter(user_from=user).values_list(
+                'user_to_id', flat=True
+            )),
+        )
+        cache.set(key, overlay, RECIPE_OVERLAY_CACHE_TIMEOUT)
+    return overlay
+
+
+def invalidate_overlays(user_ids):
+    """Сброс наборов id избранного, списка покупок и подписок."""
+    cache.delete_many(
+        [RECIPE_OVERLAY_CACHE_KEY.format(user_id) for user_id in user_ids]
+    )
+
+
+def apply_overlay(document, overlay):
+    """Документ рецепта с признаками пользователя."""
+    favorites, cart, subscriptions = overlay or (set(), set(), set())
+    return {
+        **document,
+        'author': {
+            **document['author'],
+            'is_subscribed': document['author']['id'] in subscriptions,
+        },
+        'is_in_shopping_cart': document['id'] in cart,
+        'is_favorited': document['id'] in favorites,
+    }
+
+
+def get_recipe_documents(recipes, request):
+    """Представления рецептов для пользователя запроса.
+
+    Отсутствующие в кеше документы загружаются одним запросом с
+    предвыборкой связей и сохраняются в кеш.
+    """
+    keys = {recipe.id: get_document_key(recipe, request) for recipe in recipes}
+    documents = cache.get_many(keys.values())
+    missing = [
+        recipe_id for recipe_id, key in keys.items() if key not in documents
+    ]
+    if missing:
+        fresh = {
+            keys[recipe.id]: RecipeDocumentSerializer(
+                recipe, context={'request': request}
+            ).data
+            for recipe in Recipe.objects.filter(
+                id__in=missing
+            ).select_related('author').prefetch_related(
+                'ingredients__ingredient', 'tags'
+            )
+        }
+        cache.set_many(fresh, RECIPE_DOCUMENT_CACHE_TIMEOUT)
+        documents.update(fresh)
+    overlay = get_overlay(request.user)
+    return [
+        apply_overlay(documents[key], overlay)
+        for key in keys.values() if key in documents
+    ]
+
+
+def get_list_page_key(request):
+    """Ключ страницы списка рецептов по адресу запроса.
+
+    Версия страниц хранится в счетчике базы данных и не вытесняется
+    вместе с закешированными страницами.
+    """
+    return RECIPE_LIST_CACHE_KEY.format(
+        get_value(RECIPE_LIST_VERSION_KEY),
+        hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+    )
+
+
+def invalidate_list_pages():
+    """Сброс всех закешированных страниц списка рецептов."""
+    increment(RECIPE_LIST_VERSION_KEY)
+
+
+def touch_recipes(recipes):
+    """Смена версии документов рецептов кверисета recipes."""
+    recipes.update(date_updated=timezone.now())
+    invalidate_list_pages()
@@ -0,0 +1,23 @@
+"""Рендереры API проекта."""
+from rest_framework.renderers import BaseRenderer
+
+
+class PlainTextRenderer(BaseRenderer):
+    """Рендерер текстовых файлов."""
+
+    media_type = 'text/plain'
+    format = 'txt'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Текстовое представление данных (например, ошибок)."""
+        if isinstance(data, bytes):
+            return data
+        return str(data).encode(self.charset)
+
+
+class CSVRenderer(PlainTextRenderer):
+    """Рендерер файлов CSV."""
+
+    media_type = 'text/csv'
+    format = 'csv'
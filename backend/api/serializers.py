@@ -1,15 +1,29 @@
 """Сериализаторы API проекта."""
 import base64
+import binascii
+from collections.abc import Mapping
+from functools import partial
+from tempfile import SpooledTemporaryFile
 
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.core.files.base import ContentFile
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.core.files.uploadedfile import UploadedFile
+from django.db import transaction
 from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
 from rest_framework.serializers import ModelSerializer
 
-from favorite.models import Favorite
+from api.querysets import get_recipes_limit, with_author_recipes
+from api.shopping_list import invalidate_recipe_shopping_lists
+from feed.timeline import fan_out_recipe
+from foodgram_backend.constants import (BASE64_CHUNK_SIZE,
+                                        BULK_RECIPES_MAX_LENGTH,
+                                        IMAGE_MAX_SIZE, IMAGE_MAX_SIZE_ERROR)
 from ingredients.models import Ingredient
+from recipes.indexes import recipe_index
 from recipes.models import Recipe, RecipeIngredient
-from shopping_cart.models import ShoppingCart
+from recipes.search import update_search_documents
 from subscriptions.models import Subscription
 from tags.models import Tag
 
@@ -17,18 +31,67 @@ User = get_user_model()
 
 
 class Base64ImageField(serializers.ImageField):
-    """Класс представления изображения в формате Base64."""
+    """Класс представления изображения в формате Base64.
+
+    Принимает файл из multipart/form-data или строку data:image/...;base64.
+    Строка декодируется частями в файл, который переносится на диск
+    при превышении FILE_UPLOAD_MAX_MEMORY_SIZE, размер изображения
+    ограничен IMAGE_MAX_SIZE.
+    """
+
+    default_error_messages = {'too_large': IMAGE_MAX_SIZE_ERROR}
 
     def to_internal_value(self, data):
         """Перевод изображений из формата Base64."""
         if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
-
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
-
+            data = self.decode(data)
+        elif getattr(data, 'size', 0) > IMAGE_MAX_SIZE:
+            self.fail('too_large')
         return super().to_internal_value(data)
 
+    def decode(self, data):
+        """Декодирование строки Base64 частями во временный файл.
+
+        Строка может содержать переносы строк, как вывод утилиты base64:
+        из каждой части удаляются пробельные символы, а символы сверх
+        кратного 4 числа переносятся в следующую часть. Другие символы
+        вне алфавита Base64 и пустой результат считаются неверным
+        изображением.
+        """
+        header, _, encoded = data.partition(';base64,')
+        size = (
+            len(encoded) - encoded.count('\n') - encoded.count('\r')
+        ) // 4 * 3
+        if not encoded:
+            self.fail('invalid_image')
+        if size > IMAGE_MAX_SIZE:
+            self.fail('too_large')
+        content_type = header.removeprefix('data:')
+        name = 'temp.' + content_type.split('/')[-1]
+        image = UploadedFile(
+            SpooledTemporaryFile(settings.FILE_UPLOAD_MAX_MEMORY_SIZE),
+            name, content_type
+        )
+        remainder = ''
+        try:
+            for start in range(0, len(encoded), BASE64_CHUNK_SIZE):
+                chunk = remainder + ''.join(
+                    encoded[start:start + BASE64_CHUNK_SIZE].split()
+                )
+                end = len(chunk) - len(chunk) % 4
+                image.write(base64.b64decode(chunk[:end], validate=True))
+                remainder = chunk[end:]
+            image.write(base64.b64decode(remainder, validate=True))
+        except binascii.Error:
+            image.close()
+            self.fail('invalid_image')
+        if not image.tell():
+            image.close()
+            self.fail('invalid_image')
+        image.size = image.tell()
+        image.seek(0)
+        return image
+
     def to_representation(self, value):
         """Возвращает абсолютный URL изображения."""
         if not value:
@@ -40,10 +103,126 @@ class Base64ImageField(serializers.ImageField):
         return image_url
 
 
+class ImageDerivativesField(serializers.Field):
+    """Ссылки на уменьшенные копии изображения.
+
+    Без srcset отдается ссылка на самую узкую копию JPEG, а пока копий
+    нет - на исходное изображение. С srcset отдается значение атрибута
+    srcset из копий WebP или null, если копий еще нет.
+    """
+
+    def __init__(self, image_field, srcset=False, **kwargs):
+        """Поле для изображения image_field объекта."""
+        self.image_field = image_field
+        self.srcset = srcset
+        kwargs.update(source='*', read_only=True)
+        super().__init__(**kwargs)
+
+    def to_representation(self, instance):
+        """Ссылка на копию или значение srcset."""
+        image = getattr(instance, self.image_field)
+        if not image:
+            return None
+        derivatives = getattr(instance, f'{self.image_field}_derivatives')
+        if self.srcset:
+            return ', '.join(
+                '{0} {1}w'.format(
+                    self.get_url(image, derivative['webp']),
+                    derivative['width']
+                )
+                for derivative in derivatives
+            ) or None
+        if not derivatives:
+            return self.get_url(image, image.name)
+        return self.get_url(image, derivatives[0]['jpg'])
+
+    def get_url(self, image, name):
+        """Абсолютный URL файла name из хранилища изображения."""
+        url = image.storage.url(name)
+        request = self.context.get('request')
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Поле первичного ключа, получающее объекты одним запросом.
+
+    Если перед проверкой значений вызван prefetch со всеми переданными
+    ключами, объекты берутся из полученного словаря, а не запрашиваются
+    по одному. Сообщения об ошибках совпадают с PrimaryKeyRelatedField.
+    """
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        """Создание списочного поля с получением объектов одним запросом."""
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkManyRelatedField(**list_kwargs)
+
+    def to_pk(self, data):
+        """Приведение значения к типу первичного ключа или None."""
+        if data is None or isinstance(data, bool):
+            return None
+        try:
+            return self.get_queryset().model._meta.pk.to_python(data)
+        except (DjangoValidationError, TypeError, ValueError):
+            return None
+
+    def prefetch(self, values):
+        """Получение объектов по всем переданным ключам одним запросом."""
+        pks = {self.to_pk(value) for value in values} - {None}
+        self.instances = self.get_queryset().in_bulk(pks)
+
+    def to_internal_value(self, data):
+        """Объект из полученных заранее или отдельным запросом."""
+        instances = getattr(self, 'instances', None)
+        pk = self.to_pk(data)
+        if instances is None or pk is None or self.pk_field is not None:
+            return super().to_internal_value(data)
+        try:
+            return instances[pk]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+
+
+class BulkManyRelatedField(serializers.ManyRelatedField):
+    """Список первичных ключей, объекты которых получаются одним запросом."""
+
+    def to_internal_value(self, data):
+        """Получение всех объектов перед проверкой элементов списка."""
+        if isinstance(data, list):
+            self.child_relation.prefetch(data)
+        return super().to_internal_value(data)
+
+
+class BulkListSerializer(serializers.ListSerializer):
+    """Список вложенных объектов с общим получением связанных объектов.
+
+    Для каждого поля BulkPrimaryKeyRelatedField вложенного сериализатора
+    объекты по всем элементам списка получаются одним запросом.
+    """
+
+    def to_internal_value(self, data):
+        """Получение связанных объектов перед проверкой элементов."""
+        if isinstance(data, list):
+            for field in self.child.fields.values():
+                if isinstance(field, BulkPrimaryKeyRelatedField):
+                    field.prefetch(
+                        item.get(field.field_name) for item in data
+                        if isinstance(item, Mapping)
+                    )
+        return super().to_internal_value(data)
+
+
 class UserSerializer(ModelSerializer):
     """Сериализатор User для отображения пользователей."""
 
     avatar = Base64ImageField(read_only=True)
+    avatar_thumb = ImageDerivativesField('avatar')
+    avatar_srcset = ImageDerivativesField('avatar', srcset=True)
     is_subscribed = serializers.SerializerMethodField()
 
     class Meta:
@@ -52,14 +231,21 @@ class UserSerializer(ModelSerializer):
         model = User
         fields = (
             'id', 'email', 'username', 'first_name', 'last_name',
-            'avatar', 'is_subscribed'
+            'avatar', 'avatar_thumb', 'avatar_srcset', 'is_subscribed'
         )
 
     def get_is_subscribed(self, obj):
-        """Получение информации о подписке на пользователя."""
+        """Получение информации о подписке на пользователя.
+
+        Для кверисетов с аннотацией is_subscribed запрос не выполняется.
+        """
+        is_subscribed = getattr(obj, 'is_subscribed', None)
+        if is_subscribed is not None:
+            return is_subscribed
         request = self.context.get('request')
-        return (
+        return bool(
             request and request.user.is_authenticated
+            and request.user != obj
             and Subscription.objects.filter(
                 user_from=request.user, user_to=obj
             ).exists()
@@ -86,56 +272,6 @@ class AvatarSerializer(ModelSerializer):
         return data
 
 
-class FavoriteCreateSerializer(ModelSerializer):
-    """Сериализатор для добавления в избранное."""
-
-    class Meta:
-        """Мета-информация сериализатора для добавления в избранное."""
-
-        model = Favorite
-        fields = ('user', 'recipe')
-
-    def validate(self, data):
-        """Валидация добавления в избранное."""
-        user = data.get('user')
-        recipe = data.get('recipe')
-        if Favorite.objects.filter(user=user, recipe=recipe).exists():
-            raise serializers.ValidationError("Рецепт уже в избранном.")
-        return data
-
-    def to_representation(self, instance):
-        """После добавления в избранное возвращается карточка рецепта."""
-        return ShortCardRecipeSerializer(
-            instance.recipe,
-            context=self.context
-        ).data
-
-
-class ShoppingCartCreateSerializer(ModelSerializer):
-    """Сериализатор для добавления в список покупок."""
-
-    class Meta:
-        """Мета-информация сериализатора добавления в список покупок."""
-
-        model = ShoppingCart
-        fields = ('user', 'recipe')
-
-    def validate(self, data):
-        """Валидация добавления в список покупок."""
-        user = data.get('user')
-        recipe = data.get('recipe')
-        if ShoppingCart.objects.filter(user=user, recipe=recipe).exists():
-            raise serializers.ValidationError("Рецепт уже в списке покупок.")
-        return data
-
-    def to_representation(self, instance):
-        """После добавления в список покупок возвращается карточка рецепта."""
-        return ShortCardRecipeSerializer(
-            instance.recipe,
-            context=self.context
-        ).data
-
-
 class IngredientSerializer(ModelSerializer):
     """Сериализатор класса Ingredient."""
 
@@ -168,22 +304,25 @@ class SubscriptionsSerializer(UserSerializer):
         model = User
         fields = (
             'id', 'email', 'username',
-            'first_name', 'last_name', 'avatar',
-            'is_subscribed', 'recipes', 'recipes_count'
+            'first_name', 'last_name', 'avatar', 'avatar_thumb',
+            'avatar_srcset', 'is_subscribed', 'recipes', 'recipes_count'
         )
 
     def get_recipes(self, obj):
         """Получение рецептов пользователя (с ограничением)."""
-        request = self.context.get('request')
-        recipes = Recipe.objects.filter(author=obj)
-        try:
-            recipes = recipes[:int(request.query_params.get('recipes_limit'))]
-        except TypeError:
-            pass
+        recipes = getattr(obj, 'limited_recipes', None)
+        if recipes is None:
+            recipes = Recipe.objects.filter(author=obj)
+            recipes_limit = get_recipes_limit(self.context.get('request'))
+            if recipes_limit is not None:
+                recipes = recipes[:recipes_limit]
         return ShortCardRecipeSerializer(recipes, many=True).data
 
     def get_recipes_count(self, obj):
         """Количество рецептов пользователя."""
+        recipes_count = getattr(obj, 'recipes_count', None)
+        if recipes_count is not None:
+            return recipes_count
         return Recipe.objects.filter(author=obj).count()
 
 
@@ -210,16 +349,17 @@ class SubscriptionCreateSerializer(ModelSerializer):
 
     def to_representation(self, instance):
         """Вернуть данные пользователя, на которого подписались."""
-        return SubscriptionsSerializer(
-            instance.user_to,
-            context=self.context
-        ).data
+        user_to = with_author_recipes(
+            User.objects.filter(pk=instance.user_to_id),
+            self.context['request']
+        ).get()
+        return SubscriptionsSerializer(user_to, context=self.context).data
 
 
 class RecipeIngredientCreateSerializer(ModelSerializer):
     """Сериализатор создания RecipeIngredient."""
 
-    id = serializers.PrimaryKeyRelatedField(
+    id = BulkPrimaryKeyRelatedField(
         queryset=Ingredient.objects.all(),
         source='ingredient.id',
         required=True,
@@ -230,6 +370,7 @@ class RecipeIngredientCreateSerializer(ModelSerializer):
 
         model = RecipeIngredient
         fields = ('id', 'amount')
+        list_serializer_class = BulkListSerializer
 
 
 class RecipeIngredientRetrieveSerializer(ModelSerializer):
@@ -255,7 +396,7 @@ class RecipeCreateUpdateSerializer(ModelSerializer):
     ingredients = RecipeIngredientCreateSerializer(
         many=True, required=True, allow_empty=False
     )
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = BulkPrimaryKeyRelatedField(
         queryset=Tag.objects.all(), many=True, required=True, allow_empty=False
     )
     image = Base64ImageField(required=True)
@@ -297,17 +438,43 @@ class RecipeCreateUpdateSerializer(ModelSerializer):
     def create(self, validated_data):
         """Создание рецепта с обработкой ингредиентов."""
         ingredients_data = validated_data.pop('ingredients')
+        tags = validated_data['tags']
         validated_data['author'] = self.context['request'].user
         recipe = super().create(validated_data)
-        self._create_ingredients(recipe, ingredients_data)
+        recipe_ingredients = self._create_ingredients(
+            recipe, ingredients_data
+        )
+        self._update_indexes(recipe, ingredients_data, tags)
+        fan_out_recipe(recipe)
+        self.saved_relations = (recipe_ingredients, tags)
+        recipe.is_favorited = False
+        recipe.is_in_shopping_cart = False
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        """Обновление рецепта с обработкой ингредиентов."""
+        """Обновление рецепта с изменением только отличающихся связей.
+
+        Ингредиенты и теги сравниваются с текущими: новые добавляются,
+        удаленные удаляются, у оставшихся ингредиентов обновляется только
+        измененное количество.
+        """
         ingredients_data = validated_data.pop('ingredients', [])
+        tags = validated_data.pop('tags', [])
         instance = super().update(instance, validated_data)
-        instance.ingredients.all().delete()
-        self._create_ingredients(instance, ingredients_data)
+        recipe_ingredients, ingredients_changed = self._update_ingredients(
+            instance, ingredients_data
+        )
+        tags_changed = self._update_tags(instance, tags)
+        self.saved_relations = (recipe_ingredients, tags)
+        if ingredients_changed or tags_changed:
+            self._update_indexes(instance, ingredients_data, tags)
+        else:
+            update_search_documents((instance.id,))
+        if ingredients_changed:
+            transaction.on_commit(partial(
+                invalidate_recipe_shopping_lists, (instance.id,)
+            ))
         return instance
 
     @staticmethod
@@ -321,11 +488,110 @@ class RecipeCreateUpdateSerializer(ModelSerializer):
             )
             for ingredient_data in ingredients_data
         ]
-        RecipeIngredient.objects.bulk_create(ingredients)
+        return RecipeIngredient.objects.bulk_create(ingredients)
+
+    @staticmethod
+    def _update_ingredients(recipe, ingredients_data):
+        """Применение разницы ингредиентов.
+
+        Возвращает итоговые строки ингредиентов рецепта и признак того,
+        что в базе данных были изменения.
+        """
+        current = {
+            recipe_ingredient.ingredient_id: recipe_ingredient
+            for recipe_ingredient in recipe.ingredients.all()
+        }
+        submitted = {
+            ingredient_data['ingredient']['id'].id
+            for ingredient_data in ingredients_data
+        }
+        removed = [
+            recipe_ingredient.id
+            for ingredient_id, recipe_ingredient in current.items()
+            if ingredient_id not in submitted
+        ]
+        changed = []
+        created = []
+        for ingredient_data in ingredients_data:
+            ingredient = ingredient_data['ingredient']['id']
+            amount = ingredient_data['amount']
+            recipe_ingredient = current.get(ingredient.id)
+            if recipe_ingredient is None:
+                created.append(RecipeIngredient(
+                    recipe=recipe, ingredient=ingredient, amount=amount
+                ))
+            elif recipe_ingredient.amount != amount:
+                recipe_ingredient.amount = amount
+                changed.append(recipe_ingredient)
+        if removed:
+            RecipeIngredient.objects.filter(pk__in=removed).delete()
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ('amount',))
+        if created:
+            RecipeIngredient.objects.bulk_create(created)
+        return (
+            [
+                recipe_ingredient for ingredient_id, recipe_ingredient
+                in current.items() if ingredient_id in submitted
+            ] + created,
+            bool(removed or changed or created)
+        )
+
+    @staticmethod
+    def _update_tags(recipe, tags):
+        """Применение разницы тегов; True, если были изменения."""
+        current = {tag.id for tag in recipe.tags.all()}
+        new = {tag.id for tag in tags}
+        if current - new:
+            recipe.tags.remove(*(current - new))
+        if new - current:
+            recipe.tags.add(*(new - current))
+        return current != new
+
+    @staticmethod
+    def _set_relations(recipe, recipe_ingredients, tags):
+        """Подстановка сохраненных ингредиентов и тегов в кеш рецепта."""
+        relations = {
+            'ingredients': sorted(
+                recipe_ingredients,
+                key=lambda recipe_ingredient: (
+                    recipe_ingredient.ingredient.name,
+                    recipe_ingredient.ingredient.measurement_unit
+                )
+            ),
+            'tags': sorted(tags, key=lambda tag: tag.name),
+        }
+        if not hasattr(recipe, '_prefetched_objects_cache'):
+            recipe._prefetched_objects_cache = {}
+        for name, objects in relations.items():
+            recipe._prefetched_objects_cache.pop(name, None)
+            queryset = getattr(recipe, name).get_queryset()
+            queryset._result_cache = objects
+            queryset._prefetch_done = True
+            recipe._prefetched_objects_cache[name] = queryset
+
+    @staticmethod
+    def _update_indexes(recipe, ingredients_data, tags):
+        """Обновление поискового документа и индекса рецептов."""
+        update_search_documents((recipe.id,))
+        recipe_index.update_recipe(
+            recipe.id,
+            (
+                ingredient_data['ingredient']['id'].id
+                for ingredient_data in ingredients_data
+            ),
+            (tag.id for tag in tags)
+        )
 
     def to_representation(self, instance):
-        """Возвращает представление рецепта после создания/обновления."""
-        instance = self.context.get('view').get_queryset().get(pk=instance.pk)
+        """Возвращает представление рецепта после создания/обновления.
+
+        Сохраненные ингредиенты и теги подставляются в кеш предвыборки
+        рецепта, поэтому повторных запросов к базе данных не требуется.
+        """
+        saved_relations = getattr(self, 'saved_relations', None)
+        if saved_relations is not None:
+            self._set_relations(instance, *saved_relations)
         return RecipeRetrieveSerializer(instance, context=self.context).data
 
 
@@ -336,6 +602,8 @@ class RecipeRetrieveSerializer(ModelSerializer):
     author = UserSerializer(read_only=True)
     tags = TagSerializer(many=True)
     image = Base64ImageField()
+    image_thumb = ImageDerivativesField('image')
+    srcset = ImageDerivativesField('image', srcset=True)
     is_in_shopping_cart = serializers.BooleanField(read_only=True)
     is_favorited = serializers.BooleanField(read_only=True)
 
@@ -344,8 +612,39 @@ class RecipeRetrieveSerializer(ModelSerializer):
 
         model = Recipe
         fields = (
-            'id', 'name', 'text', 'image', 'ingredients', 'tags',
-            'cooking_time', 'author', 'is_in_shopping_cart', 'is_favorited'
+            'id', 'name', 'text', 'image', 'image_thumb', 'srcset',
+            'ingredients', 'tags', 'cooking_time', 'author',
+            'is_in_shopping_cart', 'is_favorited'
+        )
+
+
+class AuthorDocumentSerializer(UserSerializer):
+    """Сериализатор автора рецепта без данных текущего пользователя."""
+
+    class Meta(UserSerializer.Meta):
+        """Мета-информация сериализатора автора рецепта."""
+
+        fields = tuple(
+            field for field in UserSerializer.Meta.fields
+            if field != 'is_subscribed'
+        )
+
+
+class RecipeDocumentSerializer(RecipeRetrieveSerializer):
+    """Сериализатор общего для всех пользователей документа рецепта.
+
+    Признаки is_favorited, is_in_shopping_cart и author.is_subscribed
+    добавляются к документу отдельно для каждого пользователя.
+    """
+
+    author = AuthorDocumentSerializer(read_only=True)
+
+    class Meta(RecipeRetrieveSerializer.Meta):
+        """Мета-информация сериализатора документа рецепта."""
+
+        fields = tuple(
+            field for field in RecipeRetrieveSerializer.Meta.fields
+            if field not in ('is_in_shopping_cart', 'is_favorited')
         )
 
 
@@ -353,9 +652,52 @@ class ShortCardRecipeSerializer(ModelSerializer):
     """Сериализатор короткого описания Recipe."""
 
     image = Base64ImageField()
+    image_thumb = ImageDerivativesField('image')
+    srcset = ImageDerivativesField('image', srcset=True)
 
     class Meta:
         """Мета-информация сериализатора короткого описания Recipe."""
 
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = (
+            'id', 'name', 'image', 'image_thumb', 'srcset', 'cooking_time'
+        )
         model = Recipe
+
+
+class IngredientSearchSerializer(serializers.Serializer):
+    """Сериализатор параметров поиска ингредиентов по названию."""
+
+    name = serializers.CharField(required=False, allow_blank=True)
+    fuzzy = serializers.BooleanField(default=False)
+
+
+class PantrySerializer(serializers.Serializer):
+    """Сериализатор набора имеющихся у пользователя ингредиентов."""
+
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False
+    )
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    """Сериализатор списка id рецептов для пакетных операций."""
+
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False, max_length=BULK_RECIPES_MAX_LENGTH
+    )
+
+
+class PantryRecipeSerializer(ShortCardRecipeSerializer):
+    """Сериализатор рецепта, подобранного по имеющимся ингредиентам."""
+
+    coverage = serializers.FloatField(read_only=True)
+    missing_ingredients = IngredientSerializer(many=True, read_only=True)
+
+    class Meta(ShortCardRecipeSerializer.Meta):
+        """Мета-информация сериализатора подобранного рецепта."""
+
+        fields = (
+            *ShortCardRecipeSerializer.Meta.fields,
+            'coverage', 'missing_ingredients'
+        )
@@ -0,0 +1,100 @@
+"""Формирование и выгрузка списка покупок."""
+import csv
+import json
+
+from django.core.cache import cache
+from django.db.models import Sum
+
+from foodgram_backend.constants import (INGREDIENT_FORMAT,
+                                        SHOPPING_LIST_CACHE_KEY,
+                                        SHOPPING_LIST_CACHE_TIMEOUT)
+from ingredients.units import aggregate_amounts
+from recipes.models import RecipeIngredient
+from shopping_cart.models import ShoppingCart
+
+
+def get_shopping_list(user):
+    """Суммарные ингредиенты рецептов из списка покупок пользователя.
+
+    Количества суммируются в базе данных по ингредиентам и затем
+    приводятся к каноническим единицам по таблице приведения.
+    Результат агрегации кешируется и сбрасывается при изменении списка
+    покупок пользователя или входящих в него рецептов.
+    """
+    key = SHOPPING_LIST_CACHE_KEY.format(user.id)
+    items = cache.get(key)
+    if items is None:
+        items = aggregate_amounts(
+            RecipeIngredient.objects.filter(
+                recipe__shopping_cart__user=user
+            ).values('ingredient').annotate(
+                total_amount=Sum('amount')
+            ).values_list('ingredient', 'total_amount').order_by()
+        )
+        cache.set(key, items, SHOPPING_LIST_CACHE_TIMEOUT)
+    return items
+
+
+def invalidate_shopping_lists(user_ids):
+    """Сброс закешированных списков покупок пользователей."""
+    cache.delete_many(
+        [SHOPPING_LIST_CACHE_KEY.format(user_id) for user_id in user_ids]
+    )
+
+
+def invalidate_recipe_shopping_lists(recipe_ids):
+    """Сброс списков покупок всех пользователей, добавивших рецепты.
+
+    Выполняется в процессе запроса, а не фоновой задачей: ключи
+    удаляются одним запросом к кешу, и сброс не зависит от того, видит
+    ли обработчик задач тот же кеш, что и веб-процессы.
+    """
+    invalidate_shopping_lists(set(
+        ShoppingCart.objects.filter(
+            recipe__in=recipe_ids
+        ).values_list('user_id', flat=True)
+    ))
+
+
+class Echo:
+    """Буфер, возвращающий записанное значение, для потоковой записи CSV."""
+
+    def write(self, value):
+        """Возврат строки вместо записи в буфер."""
+        return value
+
+
+def render_txt(items):
+    """Построчная выгрузка списка покупок в текстовом формате."""
+    yield 'Полный список ингредиентов:\n'
+    for index, (name, unit, amount) in enumerate(items):
+        line = INGREDIENT_FORMAT.format(f'{name} ({unit})', amount)
+        yield f';\n{line}' if index else line
+    yield '.'
+
+
+def render_csv(items):
+    """Построчная выгрузка списка покупок в формате CSV."""
+    writer = csv.writer(Echo())
+    yield writer.writerow(('Ингредиент', 'Единица измерения', 'Количество'))
+    for item in items:
+        yield writer.writerow(item)
+
+
+def render_json(items):
+    """Поэлементная выгрузка списка покупок в формате JSON."""
+    yield '['
+    for index, (name, unit, amount) in enumerate(items):
+        item = json.dumps(
+            {'name': name, 'measurement_unit': unit, 'amount': amount},
+            ensure_ascii=False
+        )
+        yield f',{item}' if index else item
+    yield ']'
+
+
+EXPORT_FORMATS = {
+    'txt': (render_txt, 'text/plain; charset=utf-8'),
+    'csv': (render_csv, 'text/csv; charset=utf-8'),
+    'json': (render_json, 'application/json'),
+}
@@ -0,0 +1,78 @@
+"""Сигналы приложения api."""
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from api.recipe_cache import invalidate_list_pages, touch_recipes
+from api.shopping_list import invalidate_shopping_lists
+from foodgram_backend.images import derivatives_updated
+from ingredients.models import Ingredient
+from recipes.models import Recipe
+from shopping_cart.models import ShoppingCart
+from tags.models import Tag
+
+User = get_user_model()
+
+AUTHOR_FIELDS = frozenset((
+    'email', 'username', 'first_name', 'last_name', 'avatar',
+    'avatar_derivatives',
+))
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def invalidate_recipe_lists(**kwargs):
+    """Сброс страниц списка рецептов при изменении рецепта."""
+    invalidate_list_pages()
+
+
+@receiver(post_save, sender=User)
+def touch_author_recipes(instance, created, update_fields=None, **kwargs):
+    """Смена версии документов рецептов при изменении их автора."""
+    if created or (
+        update_fields is not None and not AUTHOR_FIELDS & update_fields
+    ):
+        return
+    touch_recipes(Recipe.objects.filter(author=instance))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(pre_delete, sender=Tag)
+def touch_tag_recipes(instance, **kwargs):
+    """Смена версии документов рецептов с измененным тегом."""
+    touch_recipes(Recipe.objects.filter(tags=instance))
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(pre_delete, sender=Ingredient)
+def touch_ingredient_recipes(instance, **kwargs):
+    """Смена версии документов рецептов с измененным ингредиентом."""
+    touch_recipes(Recipe.objects.filter(ingredients__ingredient=instance))
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(pre_delete, sender=Ingredient)
+def invalidate_ingredient_shopping_lists(instance, **kwargs):
+    """Сброс списков покупок с измененным ингредиентом.
+
+    Закешированные списки содержат названия и единицы измерения
+    ингредиентов. Пользователи определяются до удаления ингредиента,
+    ключи удаляются после фиксации транзакции.
+    """
+    transaction.on_commit(partial(invalidate_shopping_lists, set(
+        ShoppingCart.objects.filter(
+            recipe__ingredients__ingredient=instance
+        ).values_list('user_id', flat=True)
+    )))
+
+
+@receiver(derivatives_updated)
+def touch_derivative_recipes(sender, pk, **kwargs):
+    """Смена версии документов после создания копий изображений."""
+    if sender is Recipe:
+        touch_recipes(Recipe.objects.filter(pk=pk))
+    elif sender is User:
+        touch_recipes(Recipe.objects.filter(author_id=pk))
@@ -0,0 +1,307 @@
+"""Тесты приложения api."""
+import base64
+from datetime import timedelta
+from io import BytesIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase
+from django.utils import timezone
+from PIL import Image
+from rest_framework import serializers, status
+from rest_framework.test import APITestCase
+
+from api.pagination import RecipeCursorPagination
+from api.recipe_cache import touch_recipes
+from api.serializers import Base64ImageField
+from recipes.models import Recipe
+
+User = get_user_model()
+
+
+def get_png(size=(40, 30)):
+    """Содержимое PNG-изображения заданного размера."""
+    buffer = BytesIO()
+    Image.new('RGB', size, (255, 0, 0)).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def split_lines(encoded, length=76, separator='\r\n'):
+    """Строка Base64 с переносами, как в выводе утилиты base64."""
+    return separator.join(
+        encoded[start:start + length]
+        for start in range(0, len(encoded), length)
+    )
+
+
+class ImageSerializer(serializers.Serializer):
+    """Сериализатор с одним полем изображения."""
+
+    image = Base64ImageField()
+
+
+class Base64ImageFieldTests(SimpleTestCase):
+    """Декодирование изображений из строки Base64."""
+
+    def setUp(self):
+        """Изображение и его представление в Base64."""
+        self.content = get_png((120, 90))
+        self.encoded = base64.b64encode(self.content).decode()
+
+    @staticmethod
+    def validate(encoded):
+        """Сериализатор, проверивший строку Base64 encoded."""
+        serializer = ImageSerializer(
+            data={'image': f'data:image/png;base64,{encoded}'}
+        )
+        serializer.is_valid()
+        return serializer
+
+    def decode(self, encoded):
+        """Содержимое файла, полученного полем из строки encoded."""
+        serializer = self.validate(encoded)
+        self.assertEqual(serializer.errors, {})
+        image = serializer.validated_data['image']
+        self.assertEqual(image.size, len(self.content))
+        return image.read()
+
+    def assertFails(self, encoded, code):
+        """Поле отклоняет строку encoded с ошибкой code."""
+        self.assertEqual(
+            self.validate(encoded).errors['image'][0].code, code
+        )
+
+    def test_decode(self):
+        """Строка без переносов декодируется целиком."""
+        self.assertEqual(self.decode(self.encoded), self.content)
+
+    @mock.patch('api.serializers.BASE64_CHUNK_SIZE', 10)
+    def test_decode_chunks(self):
+        """Части, не кратные 4 символам, декодируются без потерь."""
+        self.assertEqual(self.decode(self.encoded), self.content)
+
+    @mock.patch('api.serializers.BASE64_CHUNK_SIZE', 50)
+    def test_line_breaks(self):
+        """Переносы строк LF и CRLF на границах частей пропускаются."""
+        for separator in ('\n', '\r\n'):
+            with self.subTest(separator=repr(separator)):
+                self.assertEqual(
+                    self.decode(split_lines(self.encoded, 76, separator)),
+                    self.content
+                )
+
+    def test_size_limit(self):
+        """Изображение больше IMAGE_MAX_SIZE отклоняется до декодирования."""
+        estimate = len(self.encoded) // 4 * 3
+        with mock.patch('api.serializers.IMAGE_MAX_SIZE', estimate - 1):
+            self.assertFails(self.encoded, 'too_large')
+
+    def test_size_limit_ignores_line_breaks(self):
+        """Переносы строк не учитываются в оценке размера."""
+        estimate = len(self.encoded) // 4 * 3
+        with mock.patch('api.serializers.IMAGE_MAX_SIZE', estimate):
+            self.assertEqual(
+                self.decode(split_lines(self.encoded, 4)), self.content
+            )
+
+    def test_invalid(self):
+        """Символы вне алфавита и пустая строка - неверное изображение."""
+        for encoded in ('!!!!', '', '****QUJD', self.encoded[:-1] + '!'):
+            with self.subTest(encoded=encoded[:10]):
+                self.assertFails(encoded, 'invalid_image')
+
+    def test_not_image(self):
+        """Декодированные данные, не являющиеся изображением, отклоняются."""
+        self.assertFails(
+            base64.b64encode(b'not an image').decode(), 'invalid_image'
+        )
+        self.assertFails(
+            self.encoded[:len(self.encoded) // 2], 'invalid_image'
+        )
+
+
+class CursorPaginationTests(APITestCase):
+    """Курсорная пагинация списка рецептов."""
+
+    url = '/api/recipes/'
+
+    @classmethod
+    def setUpTestData(cls):
+        """Пять рецептов, два из которых созданы в один момент."""
+        author = User.objects.create_user(
+            email='author@foodgram.ru', username='author',
+            first_name='Автор', last_name='Рецептов', password='password'
+        )
+        now = timezone.now()
+        cls.recipes = []
+        for number, minutes in enumerate((5, 4, 3, 3, 1)):
+            recipe = Recipe.objects.create(
+                author=author, name=f'Рецепт {number}', text='Текст',
+                image=f'recipes/{number}.png', cooking_time=1
+            )
+            Recipe.objects.filter(pk=recipe.pk).update(
+                date_created=now - timedelta(minutes=minutes)
+            )
+            cls.recipes.append(recipe)
+        cls.expected_ids = list(Recipe.objects.order_by(
+            '-date_created', '-id'
+        ).values_list('id', flat=True))
+
+    def test_pages(self):
+        """Страницы идут по убыванию (date_created, id) без повторов."""
+        ids = []
+        url = f'{self.url}?cursor=&limit=2'
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            self.assertLessEqual(len(response.data['results']), 2)
+            ids += [recipe['id'] for recipe in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(ids, self.expected_ids)
+
+    def test_cursor_round_trip(self):
+        """Курсор рецепта разбирается в его дату создания и id."""
+        recipe = Recipe.objects.get(pk=self.recipes[2].pk)
+        paginator = RecipeCursorPagination()
+        self.assertEqual(
+            paginator.decode_cursor(paginator.encode_cursor(recipe)),
+            (recipe.date_created, recipe.pk)
+        )
+        self.assertIsNone(paginator.decode_cursor(''))
+
+    def test_invalid_cursor(self):
+        """Неверный курсор дает 404."""
+        for cursor in ('zzz', base64.urlsafe_b64encode(b'x|1').decode()):
+            with self.subTest(cursor=cursor):
+                self.assertEqual(
+                    self.client.get(f'{self.url}?cursor={cursor}').status_code,
+                    status.HTTP_404_NOT_FOUND
+                )
+
+    def test_cursor_with_ordering_or_search(self):
+        """Курсор нельзя совмещать с сортировкой и поиском."""
+        for query in ('ordering=-favorites_count', 'search=Рецепт'):
+            with self.subTest(query=query):
+                response = self.client.get(f'{self.url}?cursor=&{query}')
+                self.assertEqual(
+                    response.status_code, status.HTTP_400_BAD_REQUEST
+                )
+                self.assertIn(query.split('=')[0], response.data)
+
+    def test_empty_ordering_with_cursor(self):
+        """Пустой параметр сортировки не мешает курсору."""
+        response = self.client.get(f'{self.url}?cursor=&ordering=')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_ordering_without_cursor(self):
+        """Без курсора сортировка работает с постраничной пагинацией."""
+        response = self.client.get(f'{self.url}?ordering=-date_created')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], len(self.recipes))
+
+
+class RecipeCacheTests(APITestCase):
+    """Сброс закешированных представлений рецептов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Автор, пользователь и рецепт автора."""
+        cls.author = User.objects.create_user(
+            email='author@foodgram.ru', username='author',
+            first_name='Автор', last_name='Рецептов', password='password'
+        )
+        cls.user = User.objects.create_user(
+            email='user@foodgram.ru', username='user',
+            first_name='Пользователь', last_name='Подписок',
+            password='password'
+        )
+        cls.recipe = Recipe.objects.create(
+            author=cls.author, name='Рецепт', text='Текст',
+            image='recipes/recipe.png', cooking_time=1
+        )
+        cls.url = f'/api/recipes/{cls.recipe.pk}/'
+
+    def get_recipe(self):
+        """Представление рецепта для текущего клиента."""
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_document_cached(self):
+        """Документ обновляется только со сменой версии рецепта."""
+        self.get_recipe()
+        recipes = Recipe.objects.filter(pk=self.recipe.pk)
+        recipes.update(name='Новое название')
+        self.assertEqual(self.get_recipe()['name'], 'Рецепт')
+        touch_recipes(recipes)
+        self.assertEqual(self.get_recipe()['name'], 'Новое название')
+
+    def test_author_rename(self):
+        """Переименование автора меняет версию документов его рецептов."""
+        self.get_recipe()
+        self.author.first_name = 'Переименованный'
+        self.author.save()
+        self.assertEqual(
+            self.get_recipe()['author']['first_name'], 'Переименованный'
+        )
+
+    def test_author_unrelated_update(self):
+        """Изменение полей, не входящих в документ, не меняет версию."""
+        date_updated = Recipe.objects.get(pk=self.recipe.pk).date_updated
+        self.author.last_login = timezone.now()
+        self.author.save(update_fields=('last_login',))
+        self.assertEqual(
+            Recipe.objects.get(pk=self.recipe.pk).date_updated, date_updated
+        )
+
+    def test_subscription(self):
+        """Подписка и отписка сбрасывают признаки пользователя."""
+        self.client.force_authenticate(self.user)
+        subscribe_url = f'/api/users/{self.author.pk}/subscribe/'
+        self.assertFalse(self.get_recipe()['author']['is_subscribed'])
+        self.assertEqual(
+            self.client.post(subscribe_url).status_code,
+            status.HTTP_201_CREATED
+        )
+        self.assertTrue(self.get_recipe()['author']['is_subscribed'])
+        self.assertEqual(
+            self.client.delete(subscribe_url).status_code,
+            status.HTTP_204_NO_CONTENT
+        )
+        self.assertFalse(self.get_recipe()['author']['is_subscribed'])
+
+    def test_favorite(self):
+        """Добавление в избранное и удаление сбрасывают признаки."""
+        self.client.force_authenticate(self.user)
+        favorite_url = f'{self.url}favorite/'
+        self.assertFalse(self.get_recipe()['is_favorited'])
+        self.assertEqual(
+            self.client.post(favorite_url).status_code,
+            status.HTTP_201_CREATED
+        )
+        self.assertTrue(self.get_recipe()['is_favorited'])
+        self.assertEqual(
+            self.client.delete(favorite_url).status_code,
+            status.HTTP_204_NO_CONTENT
+        )
+        self.assertFalse(self.get_recipe()['is_favorited'])
+
+    def test_overlay_per_user(self):
+        """Признаки одного пользователя не попадают другому."""
+        self.client.force_authenticate(self.user)
+        self.client.post(f'{self.url}favorite/')
+        self.client.force_authenticate(self.author)
+        self.assertFalse(self.get_recipe()['is_favorited'])
+        self.client.force_authenticate(None)
+        self.assertFalse(self.get_recipe()['is_favorited'])
+
+    def test_anonymous_list_pages(self):
+        """Страницы списка сбрасываются при изменении рецепта."""
+        self.client.get('/api/recipes/')
+        self.recipe.name = 'Новое название'
+        self.recipe.save()
+        response = self.client.get('/api/recipes/')
+        self.assertEqual(
+            response.data['results'][0]['name'], 'Новое название'
+        )
@@ -2,31 +2,50 @@
 import django_filters
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import Exists, F, OuterRef, Sum
-from django.http import HttpResponse, HttpResponseRedirect
+from django.core.cache import cache
+from django.db.models import Exists, OuterRef, Prefetch
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
 from rest_framework import status, viewsets
-from rest_framework.decorators import action, api_view
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
 from rest_framework.permissions import (IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 
-from api.filters import IngredientFilter, RecipeFilter
-from api.pagination import RecipePagination
+from api.filters import IngredientFilter, RecipeFilter, RecipeOrderingFilter
+from api.pagination import FeedPagination, RecipePagination
 from api.permissions import IsAuthorOrReadOnly
-from api.serializers import (AvatarSerializer, FavoriteCreateSerializer,
-                             IngredientSerializer,
-                             RecipeCreateUpdateSerializer,
-                             RecipeRetrieveSerializer,
-                             ShoppingCartCreateSerializer,
+from api.querysets import annotate_is_subscribed, with_author_recipes
+from api.recipe_cache import (get_list_page_key, get_recipe_documents,
+                              invalidate_overlays)
+from api.renderers import CSVRenderer, PlainTextRenderer
+from api.serializers import (AvatarSerializer, IngredientSearchSerializer,
+                             IngredientSerializer, PantryRecipeSerializer,
+                             PantrySerializer, RecipeCreateUpdateSerializer,
+                             RecipeIdsSerializer, RecipeRetrieveSerializer,
+                             ShortCardRecipeSerializer,
                              SubscriptionCreateSerializer,
                              SubscriptionsSerializer, TagSerializer)
+from api.shopping_list import (EXPORT_FORMATS, get_shopping_list,
+                               invalidate_shopping_lists)
 from favorite.models import Favorite
-from foodgram_backend.constants import INGREDIENT_FORMAT
+from feed.timeline import add_author_to_feed, remove_author_from_feed
+from foodgram_backend.constants import (INGREDIENT_SEARCH_LIMIT,
+                                        PANTRY_RESULTS_LIMIT,
+                                        RECIPE_LIST_CACHE_TIMEOUT,
+                                        SIMILAR_RECIPES_LIMIT)
 from ingredients.models import Ingredient
+from ingredients.search import ingredient_index
+from recipes.analytics import hit_counter
+from recipes.indexes import recipe_index
 from recipes.models import Recipe
+from recipes.user_lists import add_recipes, remove_recipes
 from shopping_cart.models import ShoppingCart
 from subscriptions.models import Subscription
 from tags.models import Tag
@@ -37,9 +56,16 @@ User = get_user_model()
 class UserViewSet(UserViewSet):
     """Вьюсет для пользователей Foodgram."""
 
+    def get_queryset(self):
+        """Пользователи с признаком подписки текущего пользователя."""
+        return annotate_is_subscribed(
+            super().get_queryset(), self.request.user
+        )
+
     @action(
         detail=False, methods=['put'],
-        url_path='me/avatar', permission_classes=[IsAuthenticated]
+        url_path='me/avatar', permission_classes=[IsAuthenticated],
+        parser_classes=(JSONParser, MultiPartParser)
     )
     def update_avatar(self, request):
         """Обновление аватара пользователя."""
@@ -53,14 +79,19 @@ class UserViewSet(UserViewSet):
 
     @update_avatar.mapping.delete
     def delete_avatar(self, request):
-        """Удаление аватара пользователя."""
+        """Удаление аватара пользователя.
+
+        Файл остается в хранилище: он может быть общим для нескольких
+        пользователей и удаляется командой collect_orphan_media.
+        """
         user = request.user
         if not user.avatar:
             return Response(
                 {"detail": "Нет аватара для удаления."},
                 status=status.HTTP_400_BAD_REQUEST
             )
-        user.avatar.delete()
+        user.avatar = None
+        user.save(update_fields=('avatar', 'avatar_derivatives'))
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
@@ -77,6 +108,8 @@ class UserViewSet(UserViewSet):
         )
         serializer.is_valid(raise_exception=True)
         serializer.save()
+        add_author_to_feed(user_from, user_to)
+        invalidate_overlays((user_from.id,))
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     @update_subscribe.mapping.delete
@@ -92,6 +125,8 @@ class UserViewSet(UserViewSet):
                 {'error': 'Вы не подписаны на этого пользователя.'},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        remove_author_from_feed(user_from, user_to)
+        invalidate_overlays((user_from.id,))
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
@@ -100,10 +135,11 @@ class UserViewSet(UserViewSet):
     def subscriptions(self, request):
         """Получение списка всех подписок текущего пользователя."""
         user = request.user
-        subscribed_users = User.objects.filter(
-            Exists(Subscription.objects.filter(
+        subscribed_users = with_author_recipes(
+            User.objects.filter(Exists(Subscription.objects.filter(
                 user_from=user, user_to=OuterRef('id')
-            ))
+            ))),
+            request
         )
         page = self.paginate_queryset(subscribed_users)
         serializer = SubscriptionsSerializer(
@@ -130,6 +166,25 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientFilter
 
+    def list(self, request, *args, **kwargs):
+        """Поиск по названию выполняется по индексу в памяти процесса.
+
+        Сначала возвращаются ингредиенты, начинающиеся с переданной
+        строки, затем содержащие ее, не более INGREDIENT_SEARCH_LIMIT.
+        С параметром fuzzy=1 результаты дополняются похожими названиями.
+        """
+        serializer = IngredientSearchSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        name = serializer.validated_data.get('name')
+        if not name:
+            return super().list(request, *args, **kwargs)
+        search = (
+            ingredient_index.fuzzy_search
+            if serializer.validated_data['fuzzy']
+            else ingredient_index.search
+        )
+        return Response(search(name, INGREDIENT_SEARCH_LIMIT))
+
 
 class TagViewSet(viewsets.ReadOnlyModelViewSet):
     """Вьюсет модели Tag."""
@@ -143,63 +198,110 @@ class RecipeViewSet(viewsets.ModelViewSet):
     """Вьюсет модели Recipe."""
 
     permission_classes = (IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly)
-    filter_backends = (django_filters.rest_framework.DjangoFilterBackend,)
+    filter_backends = (
+        django_filters.rest_framework.DjangoFilterBackend,
+        RecipeOrderingFilter,
+    )
     filterset_class = RecipeFilter
+    parser_classes = (JSONParser, MultiPartParser, FormParser)
+    ordering_fields = ('favorites_count', 'in_carts_count', 'date_created')
     pagination_class = RecipePagination
 
     def get_queryset(self):
-        """Оптимизация получения кверисета."""
+        """Оптимизация получения кверисета.
+
+        Для чтения рецептов представления берутся из кеша, поэтому
+        кверисет не содержит аннотаций и связей.
+        """
+        if self.action in ('list', 'retrieve', 'feed'):
+            return Recipe.objects.all()
         user = (
             self.request.user if self.request.user.is_authenticated else None
         )
         return (
-            Recipe.objects.select_related('author').annotate(
+            Recipe.objects.annotate(
                 is_favorited=Exists(Favorite.objects.filter(
                     user=user, recipe=OuterRef('id')
                 )),
                 is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
                     user=user, recipe=OuterRef('id')
                 ))
-            ).prefetch_related('ingredients__ingredient', 'tags')
+            ).prefetch_related(
+                Prefetch('author', queryset=annotate_is_subscribed(
+                    User.objects.all(), user
+                )),
+                'ingredients__ingredient', 'tags'
+            )
         )
 
     def get_serializer_class(self):
         """Разделение сериализаторов на получение и обновление данных."""
         return (
-            RecipeRetrieveSerializer if self.action in ['list', 'retrieve']
+            RecipeRetrieveSerializer
+            if self.action in ['list', 'retrieve', 'feed']
             else RecipeCreateUpdateSerializer
         )
 
+    def list(self, request, *args, **kwargs):
+        """Список рецептов из кеша представлений.
+
+        Страницы для анонимных пользователей кешируются целиком до
+        изменения любого рецепта, но не дольше RECIPE_LIST_CACHE_TIMEOUT.
+        """
+        if request.user.is_authenticated:
+            return self._list_documents(request)
+        key = get_list_page_key(request)
+        data = cache.get(key)
+        if data is None:
+            data = self._list_documents(request).data
+            cache.set(key, data, RECIPE_LIST_CACHE_TIMEOUT)
+        return Response(data)
+
+    def _list_documents(self, request):
+        """Страница представлений рецептов с учетом фильтров."""
+        page = self.paginate_queryset(
+            self.filter_queryset(self.get_queryset())
+        )
+        return self.get_paginated_response(
+            get_recipe_documents(page, request)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        """Получение рецепта из кеша представлений с учетом просмотра."""
+        documents = get_recipe_documents((self.get_object(),), request)
+        if not documents:
+            raise Http404
+        hit_counter.record(documents[0]['id'], 'views_count')
+        return Response(documents[0])
+
+    def perform_destroy(self, instance):
+        """Удаление рецепта со сбросом зависящих от него списков покупок."""
+        user_ids = set(
+            instance.shopping_cart.values_list('user_id', flat=True)
+        )
+        recipe_id = instance.id
+        instance.delete()
+        invalidate_shopping_lists(user_ids)
+        recipe_index.delete_recipe(recipe_id)
+
     @action(
         detail=True, methods=['post'], url_path='favorite',
         permission_classes=[IsAuthenticated]
     )
     def update_favorite(self, request, pk=None):
         """Добавление в избранное."""
-        user = request.user
-        recipe = get_object_or_404(Recipe, pk=pk)
-        serializer = FavoriteCreateSerializer(
-            data={'user': user.id, 'recipe': recipe.id},
-            context={'request': request}
+        return self._add_to_list(
+            request, pk, Favorite, 'favorites_count',
+            'Рецепт уже в избранном.'
         )
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     @update_favorite.mapping.delete
     def delete_favorite(self, request, pk):
         """Удаление из избранного."""
-        user = request.user
-        recipe = get_object_or_404(Recipe, pk=pk)
-        deleted_count, _ = Favorite.objects.filter(
-            user=user, recipe=recipe
-        ).delete()
-        if not deleted_count:
-            return Response(
-                {"error": "Рецепт не обнаружен в избранном."},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        return Response(status=status.HTTP_204_NO_CONTENT)
+        return self._remove_from_list(
+            request, pk, Favorite, 'favorites_count',
+            'Рецепт не обнаружен в избранном.'
+        )
 
     @action(
         detail=True, methods=['post'], url_path='shopping_cart',
@@ -207,74 +309,255 @@ class RecipeViewSet(viewsets.ModelViewSet):
     )
     def update_shopping_cart(self, request, pk=None):
         """Добавление рецепта в списка покупок."""
-        user = request.user
-        recipe = get_object_or_404(Recipe, pk=pk)
-        serializer = ShoppingCartCreateSerializer(
-            data={'user': user.id, 'recipe': recipe.id},
-            context={'request': request}
+        response = self._add_to_list(
+            request, pk, ShoppingCart, 'in_carts_count',
+            'Рецепт уже в списке покупок.'
         )
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        invalidate_shopping_lists((request.user.id,))
+        return response
 
     @update_shopping_cart.mapping.delete
     def delete_shopping_cart(self, request, pk):
         """Удаление рецепта из списка покупок."""
-        user = request.user
-        recipe = get_object_or_404(Recipe, pk=pk)
-        deleted_count, _ = ShoppingCart.objects.filter(
-            user=user, recipe=recipe
-        ).delete()
-        if not deleted_count:
+        response = self._remove_from_list(
+            request, pk, ShoppingCart, 'in_carts_count',
+            'Рецепт не обнаружен в списке покупок.'
+        )
+        invalidate_shopping_lists((request.user.id,))
+        return response
+
+    @action(
+        detail=False, methods=['post'], url_path='favorite/bulk',
+        permission_classes=[IsAuthenticated]
+    )
+    def bulk_favorite(self, request):
+        """Добавление нескольких рецептов в избранное."""
+        return self._bulk_add(request, Favorite, 'favorites_count')
+
+    @bulk_favorite.mapping.delete
+    def delete_bulk_favorite(self, request):
+        """Удаление нескольких рецептов из избранного."""
+        return self._bulk_remove(request, Favorite, 'favorites_count')
+
+    @action(
+        detail=False, methods=['post'], url_path='shopping_cart/bulk',
+        permission_classes=[IsAuthenticated]
+    )
+    def bulk_shopping_cart(self, request):
+        """Добавление нескольких рецептов в список покупок."""
+        response = self._bulk_add(request, ShoppingCart, 'in_carts_count')
+        invalidate_shopping_lists((request.user.id,))
+        return response
+
+    @bulk_shopping_cart.mapping.delete
+    def delete_bulk_shopping_cart(self, request):
+        """Удаление нескольких рецептов из списка покупок."""
+        response = self._bulk_remove(
+            request, ShoppingCart, 'in_carts_count'
+        )
+        invalidate_shopping_lists((request.user.id,))
+        return response
+
+    @action(
+        detail=False, methods=['delete'], url_path='shopping_cart',
+        permission_classes=[IsAuthenticated]
+    )
+    def clear_shopping_cart(self, request):
+        """Очистка списка покупок."""
+        remove_recipes(
+            ShoppingCart, request.user,
+            request.user.shopping_cart.values_list('recipe_id', flat=True),
+            'in_carts_count'
+        )
+        invalidate_shopping_lists((request.user.id,))
+        invalidate_overlays((request.user.id,))
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @staticmethod
+    def _get_recipe_ids(request):
+        """Id рецептов из тела запроса пакетной операции без повторов."""
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return list(dict.fromkeys(serializer.validated_data['recipes']))
+
+    def _bulk_add(self, request, model, counter_field):
+        """Добавление рецептов в избранное или список покупок.
+
+        Для каждого id возвращается статус: added - добавлен,
+        exists - уже был в списке, not_found - рецепт не найден.
+        """
+        recipe_ids = self._get_recipe_ids(request)
+        recipes = add_recipes(model, request.user, recipe_ids, counter_field)
+        invalidate_overlays((request.user.id,))
+        return Response({'results': [
+            {
+                'id': recipe_id,
+                'status': (
+                    'not_found' if recipe_id not in recipes
+                    else 'added' if recipes[recipe_id][1] else 'exists'
+                ),
+            }
+            for recipe_id in recipe_ids
+        ]})
+
+    def _bulk_remove(self, request, model, counter_field):
+        """Удаление рецептов из избранного или списка покупок.
+
+        Для каждого id возвращается статус: removed - удален,
+        absent - не был в списке, not_found - рецепт не найден.
+        """
+        recipe_ids = self._get_recipe_ids(request)
+        removed = remove_recipes(
+            model, request.user, recipe_ids, counter_field
+        )
+        invalidate_overlays((request.user.id,))
+        return Response({'results': [
+            {
+                'id': recipe_id,
+                'status': (
+                    'not_found' if recipe_id not in removed
+                    else 'removed' if removed[recipe_id] else 'absent'
+                ),
+            }
+            for recipe_id in recipe_ids
+        ]})
+
+    @staticmethod
+    def _get_recipe_id(pk):
+        """Id рецепта из адреса запроса."""
+        try:
+            return int(pk)
+        except ValueError:
+            raise Http404
+
+    def _add_to_list(self, request, pk, model, counter_field, error):
+        """Добавление рецепта в избранное или список покупок.
+
+        Повторное добавление определяется ограничением уникальности
+        при вставке, карточка рецепта возвращается тем же запросом.
+        """
+        recipe_id = self._get_recipe_id(pk)
+        recipes = add_recipes(model, request.user, (recipe_id,), counter_field)
+        if recipe_id not in recipes:
+            raise Http404
+        recipe, created = recipes[recipe_id]
+        if not created:
+            raise ValidationError({api_settings.NON_FIELD_ERRORS_KEY: [error]})
+        invalidate_overlays((request.user.id,))
+        return Response(
+            ShortCardRecipeSerializer(
+                recipe, context={'request': request}
+            ).data,
+            status=status.HTTP_201_CREATED
+        )
+
+    def _remove_from_list(self, request, pk, model, counter_field, error):
+        """Удаление рецепта из избранного или списка покупок."""
+        recipe_id = self._get_recipe_id(pk)
+        removed = remove_recipes(
+            model, request.user, (recipe_id,), counter_field
+        )
+        if recipe_id not in removed:
+            raise Http404
+        if not removed[recipe_id]:
             return Response(
-                {"error": "Рецепт не обнаружен в списке покупок."},
-                status=status.HTTP_400_BAD_REQUEST
+                {'error': error}, status=status.HTTP_400_BAD_REQUEST
             )
+        invalidate_overlays((request.user.id,))
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
-        detail=False, methods=['get'], permission_classes=[IsAuthenticated]
+        detail=False, methods=['get'], permission_classes=[IsAuthenticated],
+        renderer_classes=(JSONRenderer, PlainTextRenderer, CSVRenderer)
     )
     def download_shopping_cart(self, request):
-        """Скачивание списка покупок текущего пользователя."""
-        user = request.user
-        ingredients = (
-            Recipe.objects.filter(shopping_cart__user=user)
-            .prefetch_related('ingredients__ingredient')
-            .values(
-                ingredient_name=F('ingredients__ingredient__name'),
-                unit=F('ingredients__ingredient__measurement_unit')
-            )
-            .annotate(total_amount=Sum('ingredients__amount'))
-            .order_by('ingredient_name')
+        """Скачивание списка покупок текущего пользователя.
+
+        Формат файла задается параметром format: txt (по умолчанию),
+        csv или json; для других форматов согласование содержимого DRF
+        возвращает 404. Файл отдается потоком по мере формирования строк.
+        """
+        export_format = request.query_params.get('format', 'txt')
+        render, content_type = EXPORT_FORMATS[export_format]
+        response = StreamingHttpResponse(
+            render(get_shopping_list(request.user)),
+            content_type=content_type
         )
-        lines = [
-            INGREDIENT_FORMAT.format(
-                f"{item['ingredient_name']} ({item['unit']})",
-                item['total_amount']
-            )
-            for item in ingredients
-        ]
-        content = 'Полный список ингредиентов:\n' + ';\n'.join(lines) + '.'
-        response = HttpResponse(content, content_type='text/plain')
         response['Content-Disposition'] = (
-            'attachment; filename="shopping_cart.txt"'
+            f'attachment; filename="shopping_cart.{export_format}"'
         )
         return response
 
+    @action(
+        detail=False, methods=['get'], permission_classes=[IsAuthenticated],
+        pagination_class=FeedPagination
+    )
+    def feed(self, request):
+        """Лента рецептов авторов, на которых подписан пользователь.
+
+        Рецепты упорядочены от новых к старым, страницы выбираются
+        по курсору из поля next ответа.
+        """
+        page = self.paginate_queryset(self.get_queryset())
+        return self.get_paginated_response(
+            get_recipe_documents(page, request)
+        )
+
+    @action(detail=False, methods=['get'])
+    def pantry(self, request):
+        """Рецепты, упорядоченные по доле имеющихся ингредиентов.
+
+        Ингредиенты передаются повторяющимся параметром ingredients.
+        Для каждого рецепта возвращаются доля имеющихся ингредиентов
+        и список недостающих.
+        """
+        serializer = PantrySerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+        matches = recipe_index.pantry(
+            serializer.validated_data['ingredients'], PANTRY_RESULTS_LIMIT
+        )
+        recipes = Recipe.objects.in_bulk(
+            [recipe_id for recipe_id, _, _ in matches]
+        )
+        ingredients = Ingredient.objects.in_bulk(
+            {pk for _, _, missing in matches for pk in missing}
+        )
+        results = []
+        for recipe_id, coverage, missing in matches:
+            recipe = recipes.get(recipe_id)
+            if recipe is None:
+                continue
+            recipe.coverage = coverage
+            recipe.missing_ingredients = [
+                ingredients[pk] for pk in missing if pk in ingredients
+            ]
+            results.append(recipe)
+        return Response(PantryRecipeSerializer(
+            results, many=True, context={'request': request}
+        ).data)
+
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk=None):
+        """Рецепты, похожие на данный по ингредиентам и тегам."""
+        try:
+            recipe_ids = recipe_index.similar(int(pk), SIMILAR_RECIPES_LIMIT)
+        except ValueError:
+            recipe_ids = None
+        if recipe_ids is None:
+            raise Http404
+        recipes = Recipe.objects.in_bulk(recipe_ids)
+        return Response(ShortCardRecipeSerializer(
+            [recipes[pk] for pk in recipe_ids if pk in recipes],
+            many=True, context={'request': request}
+        ).data)
+
     @action(detail=True, methods=['get'], url_path='get-link')
     def get_link(self, request, pk=None):
         """Представление для получения короткой ссылки на рецепт."""
         recipe = self.get_object()
-        short_url = request.build_absolute_uri(f'/s/{recipe.short_code}/')
+        short_url = request.build_absolute_uri(
+            f'/s/{recipe.get_short_code()}/'
+        )
         if settings.SECURE_PROXY_SSL_HEADER:
             short_url = short_url.replace("http://", "https://")
         return Response({'short-link': short_url})
-
-
-@api_view(('GET',))
-def short_recipe_url(request, encoded):
-    """Представление для перехода на страницу рецепта по короткой ссылке."""
-    recipe = get_object_or_404(Recipe, short_code=encoded)
-    recipe_url = f'/recipes/{recipe.id}/'
-    return HttpResponseRedirect(recipe_url)
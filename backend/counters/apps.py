@@ -0,0 +1,10 @@
+"""Настройки приложения counters."""
+from django.apps import AppConfig
+
+
+class CountersConfig(AppConfig):
+    """Класс настроек приложения counters."""
+
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'counters'
+    verbose_name = 'Счетчики версий'
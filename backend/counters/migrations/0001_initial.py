@@ -0,0 +1,25 @@
+# Generated by Django 5.1.7 on 2026-10-18 20:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Counter',
+            fields=[
+                ('key', models.CharField(max_length=255, primary_key=True, serialize=False, verbose_name='Ключ')),
+                ('value', models.PositiveBigIntegerField(default=0, verbose_name='Значение')),
+            ],
+            options={
+                'verbose_name': 'Счетчик',
+                'verbose_name_plural': 'Счетчики',
+            },
+        ),
+    ]
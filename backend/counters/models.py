@@ -0,0 +1,30 @@
+"""Модели counters."""
+from django.db import models
+
+from foodgram_backend.constants import COUNTER_KEY_MAX_LENGTH
+
+
+class Counter(models.Model):
+    """Общий для всех процессов счетчик версии или номера записи.
+
+    В отличие от ключей кеша счетчики не вытесняются, поэтому по ним
+    процессы согласуют свои структуры в памяти и кеши.
+    """
+
+    key = models.CharField(
+        max_length=COUNTER_KEY_MAX_LENGTH, primary_key=True,
+        verbose_name='Ключ'
+    )
+    value = models.PositiveBigIntegerField(
+        default=0, verbose_name='Значение'
+    )
+
+    class Meta:
+        """Мета-информация Counter."""
+
+        verbose_name = 'Счетчик'
+        verbose_name_plural = 'Счетчики'
+
+    def __str__(self):
+        """Строковое представление счетчика."""
+        return f'{self.key} = {self.value}'
@@ -0,0 +1,36 @@
+"""Чтение и атомарное увеличение счетчиков."""
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from counters.models import Counter
+
+
+def get_values(*keys):
+    """Значения счетчиков одним запросом; отсутствующие равны 0."""
+    values = dict.fromkeys(keys, 0)
+    values.update(
+        Counter.objects.filter(key__in=keys).values_list('key', 'value')
+    )
+    return values
+
+
+def get_value(key):
+    """Значение счетчика; отсутствующий счетчик равен 0."""
+    return get_values(key)[key]
+
+
+def increment(key):
+    """Увеличение счетчика на единицу; возвращает новое значение.
+
+    Значение увеличивается в базе данных, поэтому два процесса никогда
+    не получают одно и то же значение.
+    """
+    counters = Counter.objects.filter(key=key)
+    with transaction.atomic():
+        if not counters.update(value=F('value') + 1):
+            try:
+                with transaction.atomic():
+                    return Counter.objects.create(key=key, value=1).value
+            except IntegrityError:
+                counters.update(value=F('value') + 1)
+        return counters.values_list('value', flat=True).get()
@@ -0,0 +1,10 @@
+"""Настройки приложения feed."""
+from django.apps import AppConfig
+
+
+class FeedConfig(AppConfig):
+    """Класс настроек приложения feed."""
+
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'feed'
+    verbose_name = 'Лента подписок'
@@ -0,0 +1,21 @@
+"""Заполнение лент подписок по имеющимся подпискам."""
+from django.core.management.base import BaseCommand
+
+from feed.timeline import backfill_feeds
+
+
+class Command(BaseCommand):
+    """Заполнение лент подписчиков последними рецептами авторов."""
+
+    help = (
+        'Добавляет в ленты подписчиков последние рецепты авторов, '
+        'например после создания лент миграцией или загрузки фикстур. '
+        'Имеющиеся записи лент не дублируются.'
+    )
+
+    def handle(self, *args, **options):
+        """Заполнение лент всех подписок."""
+        count = backfill_feeds()
+        self.stdout.write(self.style.SUCCESS(
+            f'Ленты заполнены для подписок: {count}.'
+        ))
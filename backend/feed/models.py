@@ -0,0 +1,75 @@
+"""Модели feed."""
+from django.contrib.auth import get_user_model
+from django.db import models
+
+from recipes.models import Recipe
+
+User = get_user_model()
+
+
+class FeedEntry(models.Model):
+    """Рецепт в ленте подписок пользователя.
+
+    Записи создаются при публикации рецепта для каждого подписчика
+    автора, поэтому лента читается одним диапазоном индекса.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    date_created = models.DateTimeField(verbose_name='Дата создания рецепта')
+
+    class Meta:
+        """Мета-информация FeedEntry."""
+
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'recipe'),
+                name='unique_feed_entry'
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('user', '-date_created', '-recipe'),
+                name='feed_entry_user_date_idx'
+            ),
+        )
+
+    def __str__(self):
+        """Строковое представление записи ленты."""
+        return f'{self.recipe} в ленте {self.user}.'
+
+
+class PulledAuthor(models.Model):
+    """Автор, рецепты которого не рассылаются по лентам подписчиков.
+
+    У таких авторов слишком много подписчиков для рассылки при записи,
+    их рецепты добавляются в ленту при чтении.
+    """
+
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='pulled_author',
+        verbose_name='Автор'
+    )
+
+    class Meta:
+        """Мета-информация PulledAuthor."""
+
+        verbose_name = 'Автор без рассылки в ленты'
+        verbose_name_plural = 'Авторы без рассылки в ленты'
+
+    def __str__(self):
+        """Строковое представление автора."""
+        return str(self.author)
@@ -0,0 +1,135 @@
+"""Ленты подписок пользователей."""
+import heapq
+
+from django.db.models import Count, Q
+
+from feed.models import FeedEntry, PulledAuthor
+from foodgram_backend.constants import (FEED_BACKFILL_LIMIT,
+                                        FEED_FANOUT_BATCH_SIZE,
+                                        FEED_FANOUT_MAX_SUBSCRIBERS)
+from recipes.models import Recipe
+from subscriptions.models import Subscription
+
+
+def fan_out_recipe(recipe):
+    """Рассылка нового рецепта по лентам подписчиков автора.
+
+    Если подписчиков больше FEED_FANOUT_MAX_SUBSCRIBERS, автор помечается
+    как PulledAuthor и его рецепты добавляются в ленты при чтении.
+    """
+    author_id = recipe.author_id
+    if PulledAuthor.objects.filter(author_id=author_id).exists():
+        return
+    subscribers = Subscription.objects.filter(
+        user_to_id=author_id
+    ).values_list('user_from_id', flat=True)
+    if subscribers.count() > FEED_FANOUT_MAX_SUBSCRIBERS:
+        PulledAuthor.objects.get_or_create(author_id=author_id)
+        return
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(
+                user_id=user_id, recipe=recipe,
+                date_created=recipe.date_created
+            )
+            for user_id in subscribers
+        ),
+        batch_size=FEED_FANOUT_BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+def add_author_to_feed(user, author):
+    """Добавление последних рецептов автора в ленту нового подписчика."""
+    if PulledAuthor.objects.filter(author=author).exists():
+        return
+    FeedEntry.objects.bulk_create(
+        (
+            FeedEntry(user=user, recipe_id=pk, date_created=date_created)
+            for pk, date_created in Recipe.objects.filter(
+                author=author
+            ).order_by('-date_created', '-id').values_list(
+                'id', 'date_created'
+            )[:FEED_BACKFILL_LIMIT]
+        ),
+        ignore_conflicts=True
+    )
+
+
+def backfill_feeds():
+    """Заполнение лент всех подписчиков последними рецептами авторов.
+
+    Нужно после загрузки подписок и рецептов в обход API, например
+    фикстурой. Имеющиеся записи не дублируются; авторы, у которых
+    подписчиков больше FEED_FANOUT_MAX_SUBSCRIBERS, помечаются как
+    PulledAuthor. Возвращает число заполненных подписок.
+    """
+    count = 0
+    authors = Subscription.objects.values('user_to').annotate(
+        subscribers=Count('id')
+    ).values_list('user_to', 'subscribers').order_by()
+    for author_id, subscribers in authors:
+        if subscribers > FEED_FANOUT_MAX_SUBSCRIBERS:
+            PulledAuthor.objects.get_or_create(author_id=author_id)
+            continue
+        if PulledAuthor.objects.filter(author_id=author_id).exists():
+            continue
+        recipes = list(Recipe.objects.filter(author_id=author_id).order_by(
+            '-date_created', '-id'
+        ).values_list('id', 'date_created')[:FEED_BACKFILL_LIMIT])
+        user_ids = list(Subscription.objects.filter(
+            user_to_id=author_id
+        ).values_list('user_from_id', flat=True))
+        FeedEntry.objects.bulk_create(
+            (
+                FeedEntry(user_id=user_id, recipe_id=pk, date_created=date)
+                for user_id in user_ids
+                for pk, date in recipes
+            ),
+            batch_size=FEED_FANOUT_BATCH_SIZE,
+            ignore_conflicts=True
+        )
+        count += len(user_ids)
+    return count
+
+
+def remove_author_from_feed(user, author):
+    """Удаление рецептов автора из ленты отписавшегося пользователя."""
+    FeedEntry.objects.filter(user=user, recipe__author=author).delete()
+
+
+def get_feed(user, position, limit):
+    """Id рецептов ленты пользователя после позиции position.
+
+    Позиция - пара (date_created, id) последнего показанного рецепта.
+    Разосланные записи ленты и рецепты авторов без рассылки выбираются
+    по индексам не более чем limit строк каждые и сливаются по убыванию
+    позиции, поэтому время чтения не зависит от числа подписок.
+    """
+    entries = FeedEntry.objects.filter(user=user)
+    pulled = Recipe.objects.filter(author__in=Subscription.objects.filter(
+        user_from=user, user_to__pulled_author__isnull=False
+    ).values('user_to'))
+    if position is not None:
+        date_created, pk = position
+        entries = entries.filter(
+            Q(date_created__lt=date_created)
+            | Q(date_created=date_created, recipe_id__lt=pk)
+        )
+        pulled = pulled.filter(
+            Q(date_created__lt=date_created)
+            | Q(date_created=date_created, id__lt=pk)
+        )
+    recipe_ids = []
+    for _, pk in heapq.merge(
+        entries.order_by('-date_created', '-recipe_id').values_list(
+            'date_created', 'recipe_id'
+        )[:limit],
+        pulled.order_by('-date_created', '-id').values_list(
+            'date_created', 'id'
+        )[:limit],
+        reverse=True
+    ):
+        if not recipe_ids or recipe_ids[-1] != pk:
+            recipe_ids.append(pk)
+    return recipe_ids[:limit]
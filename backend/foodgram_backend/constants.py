@@ -37,8 +37,106 @@ COOKING_TIME_MAX_ERROR = (
     f'Время приготовления не должно превышать {COOKING_TIME_MAX}.'
 )
 
+IMAGE_MAX_SIZE = 10 * 1024 * 1024
+
+IMAGE_MAX_SIZE_ERROR = (
+    f'Размер изображения не должен превышать {IMAGE_MAX_SIZE // 2 ** 20} МБ.'
+)
+
+BASE64_CHUNK_SIZE = 64 * 1024
+
+IMAGE_DERIVATIVE_WIDTHS = (320, 640, 1280)
+
+IMAGE_DERIVATIVE_FORMATS = {'webp': 'WEBP', 'jpg': 'JPEG'}
+
+IMAGE_DERIVATIVE_QUALITY = 80
+
+IMAGE_DERIVATIVES_PATH = 'derivatives'
+
+IMAGE_DERIVATIVE_CONCURRENCY = 2
+
+MEDIA_ORPHAN_MIN_AGE = 60 * 60
+
 INGREDIENT_FORMAT = '{0} — {1}'
 
+SHOPPING_LIST_CACHE_KEY = 'shopping_list:{0}'
+
+SHOPPING_LIST_CACHE_TIMEOUT = 60 * 60 * 24
+
+RECIPE_DOCUMENT_CACHE_KEY = 'recipe_document:{0}:{1}:{2}'
+
+RECIPE_DOCUMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
+RECIPE_OVERLAY_CACHE_KEY = 'recipe_overlay:{0}'
+
+RECIPE_OVERLAY_CACHE_TIMEOUT = 60 * 60
+
+RECIPE_LIST_VERSION_KEY = 'recipe_list_version'
+
+RECIPE_LIST_CACHE_KEY = 'recipe_list:{0}:{1}'
+
+RECIPE_LIST_CACHE_TIMEOUT = 60
+
 RECIPE_PAGE_SIZE = 6
 
+INGREDIENT_SEARCH_LIMIT = 50
+
+FUZZY_SEARCH_MAX_QUERY_LENGTH = 32
+
+FUZZY_SEARCH_MIN_SIMILARITY = 0.3
+
+SEARCH_CONFIG = 'russian'
+
+PANTRY_RESULTS_LIMIT = 20
+
+SIMILAR_RECIPES_LIMIT = 6
+
+SIMILAR_RECIPES_TAG_WEIGHT = 0.5
+
+FEED_FANOUT_MAX_SUBSCRIBERS = 1000
+
+FEED_FANOUT_BATCH_SIZE = 1000
+
+FEED_BACKFILL_LIMIT = 100
+
+BULK_RECIPES_MAX_LENGTH = 100
+
 SHORT_CODE_MAX_LENGTH = 8
+
+SHORT_CODE_LENGTH = 7
+
+SHORT_CODE_BITS = 40
+
+SHORT_CODE_ROUNDS = 8
+
+SHORT_LINK_CACHE_KEY = 'short_link:{0}'
+
+SHORT_LINK_CACHE_TIMEOUT = 60 * 60 * 24
+
+SHORT_LINK_LRU_SIZE = 10000
+
+ANALYTICS_FLUSH_INTERVAL = 10
+
+ANALYTICS_FLUSH_SIZE = 1000
+
+COUNTER_KEY_MAX_LENGTH = 255
+
+LOCAL_INDEX_CHECK_INTERVAL = 5
+
+TASK_NAME_MAX_LENGTH = 255
+
+TASK_KEY_MAX_LENGTH = 255
+
+TASK_STATUS_MAX_LENGTH = 16
+
+TASK_MAX_ATTEMPTS = 5
+
+TASK_RETRY_DELAY = 10
+
+TASK_LEASE_TIMEOUT = 5 * 60
+
+TASK_POLL_INTERVAL = 1
+
+TASK_CLAIM_BATCH_SIZE = 20
+
+TASK_WORKER_THREADS = 2
@@ -0,0 +1,223 @@
+"""Уменьшенные копии загруженных изображений.
+
+Копии в форматах IMAGE_DERIVATIVE_FORMATS шириной IMAGE_DERIVATIVE_WIDTHS
+создаются фоновыми задачами после фиксации транзакции, обработка запроса
+их не ждет. Хранилище называет копии по хешу содержимого, поэтому
+пересозданные копии получают новые адреса. Ширины и имена файлов готовых
+копий сохраняются в поле модели; пока оно пустое, клиентам отдается
+исходное изображение.
+Исходный файл может быть общим для нескольких объектов, поэтому копии
+удаляются, только когда на него больше никто не ссылается.
+"""
+import posixpath
+from io import BytesIO
+
+from django.apps import apps
+from django.core.files.base import ContentFile
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import Signal
+from PIL import Image, ImageOps
+
+from foodgram_backend.constants import (IMAGE_DERIVATIVE_CONCURRENCY,
+                                        IMAGE_DERIVATIVE_FORMATS,
+                                        IMAGE_DERIVATIVE_QUALITY,
+                                        IMAGE_DERIVATIVE_WIDTHS,
+                                        IMAGE_DERIVATIVES_PATH)
+from tasks.queue import task
+
+derivatives_updated = Signal()
+"""Сигнал о сохранении готовых копий изображения объекта pk."""
+
+
+def get_derivatives_dir(name):
+    """Каталог копий изображения с именем name в хранилище."""
+    return posixpath.join(IMAGE_DERIVATIVES_PATH, name)
+
+
+def get_derivative_name(name, width, extension):
+    """Имя для сохранения копии изображения name заданной ширины и формата.
+
+    Хранилище заменяет его на имя по хешу содержимого в том же каталоге.
+    """
+    return posixpath.join(get_derivatives_dir(name), f'{width}.{extension}')
+
+
+def resize(image, width):
+    """Изображение, уменьшенное до ширины width с сохранением пропорций."""
+    if width >= image.width:
+        return image
+    return image.resize(
+        (width, max(1, round(image.height * width / image.width))),
+        Image.Resampling.LANCZOS
+    )
+
+
+def encode(image, image_format):
+    """Содержимое изображения в формате image_format."""
+    if image_format == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    elif image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA')
+    buffer = BytesIO()
+    image.save(buffer, image_format, quality=IMAGE_DERIVATIVE_QUALITY)
+    return ContentFile(buffer.getvalue())
+
+
+def create_derivatives(storage, name):
+    """Создание копий изображения name.
+
+    Возвращает список копий по возрастанию ширины: словари с шириной
+    width и именами файлов по расширениям форматов. Изображение не
+    увеличивается: копии шире исходного заменяются одной копией исходной
+    ширины. Копии с тем же содержимым не перезаписываются, измененные
+    сохраняются под новыми именами.
+    """
+    derivatives = []
+    with storage.open(name) as source, Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        widths = sorted({
+            min(width, image.width) for width in IMAGE_DERIVATIVE_WIDTHS
+        })
+        for width in widths:
+            resized = resize(image, width)
+            derivatives.append({'width': width, **{
+                extension: storage.save(
+                    get_derivative_name(name, width, extension),
+                    encode(resized, image_format)
+                )
+                for extension, image_format in IMAGE_DERIVATIVE_FORMATS.items()
+            }})
+    return derivatives
+
+
+@task(concurrency=IMAGE_DERIVATIVE_CONCURRENCY)
+def update_derivatives(model_label, pk, field_name, derivatives_field_name,
+                       name):
+    """Создание копий и сохранение их списка в объекте.
+
+    Если изображение объекта успело смениться, неиспользуемые копии
+    удаляются. Файлы замененных копий того же изображения удаляет
+    команда collect_orphan_media.
+    """
+    model = apps.get_model(model_label)
+    storage = model._meta.get_field(field_name).storage
+    derivatives = create_derivatives(storage, name)
+    updated = model.objects.filter(
+        pk=pk, **{field_name: name}
+    ).update(**{derivatives_field_name: derivatives})
+    if updated:
+        derivatives_updated.send(sender=model, pk=pk)
+    else:
+        remove_unused_derivatives(model_label, field_name, name)
+
+
+@task()
+def remove_unused_derivatives(model_label, field_name, name):
+    """Удаление копий изображения name, если на него не ссылаются."""
+    if not image_derivatives.is_referenced(name):
+        remove_derivatives(
+            apps.get_model(model_label)._meta.get_field(field_name).storage,
+            name
+        )
+
+
+def remove_derivatives(storage, name):
+    """Удаление всех копий изображения name."""
+    directory = get_derivatives_dir(name)
+    try:
+        _, files = storage.listdir(directory)
+    except FileNotFoundError:
+        return
+    for file_name in files:
+        storage.delete(posixpath.join(directory, file_name))
+
+
+class ImageDerivatives:
+    """Создание и удаление копий изображений зарегистрированных полей.
+
+    Задачи создания копий ставятся в очередь при сохранении нового
+    изображения, задачи удаления - при его замене или удалении объекта.
+    """
+
+    def __init__(self):
+        """Реестр без полей."""
+        self.fields = []
+
+    def register(self, model, field_name, derivatives_field_name):
+        """Подключение копий для поля изображения модели.
+
+        derivatives_field_name - поле со списком готовых копий.
+        """
+        self.fields.append((model, field_name, derivatives_field_name))
+        label = model._meta.label
+        uid = f'image_derivatives:{label}.{field_name}'
+
+        def remember_old_image(instance, raw=False, update_fields=None,
+                               **kwargs):
+            """Запоминание заменяемого изображения перед сохранением."""
+            if raw or (
+                update_fields is not None and field_name not in update_fields
+            ):
+                return
+            old_name = ''
+            if not instance._state.adding:
+                old_name = model.objects.filter(pk=instance.pk).values_list(
+                    field_name, flat=True
+                ).first() or ''
+            if old_name != (getattr(instance, field_name).name or ''):
+                setattr(instance, derivatives_field_name, [])
+                instance.__dict__.setdefault('_replaced_images', {})[
+                    field_name
+                ] = old_name
+
+        def schedule_derivatives(instance, update_fields=None, **kwargs):
+            """Постановка в очередь создания и удаления копий."""
+            replaced = instance.__dict__.get('_replaced_images', {})
+            if field_name not in replaced:
+                return
+            old_name = replaced.pop(field_name)
+            if (
+                update_fields is not None
+                and derivatives_field_name not in update_fields
+            ):
+                model.objects.filter(pk=instance.pk).update(
+                    **{derivatives_field_name: []}
+                )
+            name = getattr(instance, field_name).name
+            if old_name and old_name != name:
+                remove_unused_derivatives.enqueue(
+                    label, field_name, old_name, key=old_name
+                )
+            if name:
+                update_derivatives.enqueue(
+                    label, instance.pk, field_name, derivatives_field_name,
+                    name, key=f'{label}:{instance.pk}:{name}'
+                )
+
+        def schedule_removal(instance, **kwargs):
+            """Постановка в очередь удаления копий удаленного объекта."""
+            name = getattr(instance, field_name).name
+            if name:
+                remove_unused_derivatives.enqueue(
+                    label, field_name, name, key=name
+                )
+
+        pre_save.connect(
+            remember_old_image, sender=model, weak=False, dispatch_uid=uid
+        )
+        post_save.connect(
+            schedule_derivatives, sender=model, weak=False, dispatch_uid=uid
+        )
+        post_delete.connect(
+            schedule_removal, sender=model, weak=False, dispatch_uid=uid
+        )
+
+    def is_referenced(self, name):
+        """Ссылается ли на изображение name хотя бы один объект."""
+        return any(
+            model.objects.filter(**{field_name: name}).exists()
+            for model, field_name, _ in self.fields
+        )
+
+
+image_derivatives = ImageDerivatives()
@@ -0,0 +1,165 @@
+"""Структуры данных в памяти процесса с общей версией в базе данных."""
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+
+from counters.store import get_value, get_values, increment
+from foodgram_backend.constants import LOCAL_INDEX_CHECK_INTERVAL
+
+
+class LocalIndex:
+    """Структура данных, построенная в памяти процесса.
+
+    Каждый процесс строит структуру при первом обращении. Актуальность
+    проверяется по счетчику версии в базе данных: изменение данных в
+    любом процессе увеличивает версию, и остальные процессы перестраивают
+    структуру при следующем обращении. Счетчик, в отличие от ключа кеша,
+    не вытесняется, поэтому изменение не может быть потеряно.
+    Версия читается не чаще раза в check_interval секунд, поэтому
+    обращения к построенной структуре не выполняют запросов к базе
+    данных, а изменения из других процессов становятся видны с
+    задержкой до check_interval. Изменения текущего процесса видны
+    сразу.
+    """
+
+    version_key = None
+    check_interval = LOCAL_INDEX_CHECK_INTERVAL
+
+    def __init__(self):
+        """Пустая структура без версии."""
+        self._lock = threading.Lock()
+        self._version = None
+        self._data = None
+        self._checked = None
+
+    def build(self):
+        """Построение структуры из базы данных."""
+        raise NotImplementedError
+
+    def get_version(self):
+        """Текущая общая версия структуры."""
+        return get_value(self.version_key)
+
+    def is_checked(self):
+        """Проверялась ли версия не раньше чем check_interval назад."""
+        return (
+            self._checked is not None
+            and time.monotonic() - self._checked < self.check_interval
+        )
+
+    def get(self):
+        """Актуальная структура; при смене версии она перестраивается."""
+        data = self._data
+        if data is not None and self.is_checked():
+            return data
+        version = self.get_version()
+        with self._lock:
+            if self._data is None or self._version != version:
+                self._data = self.build()
+                self._version = version
+            self._checked = time.monotonic()
+            return self._data
+
+    def warm_up(self):
+        """Построение структуры в фоновом потоке.
+
+        Вызывается в рабочем процессе gunicorn после загрузки приложения
+        (gunicorn.conf.py), чтобы построение не ждал первый запрос.
+        """
+        def build():
+            try:
+                self.get()
+            except DatabaseError:
+                pass
+            finally:
+                connection.close()
+
+        threading.Thread(
+            target=build, name=f'{type(self).__name__}-warm-up', daemon=True
+        ).start()
+
+    def invalidate(self):
+        """Сброс структуры во всех процессах."""
+        increment(self.version_key)
+        self._data = None
+
+
+class IncrementalLocalIndex(LocalIndex):
+    """Структура в памяти процесса с журналом изменений в общем кеше.
+
+    Изменения не перестраивают структуру целиком: каждое изменение
+    получает порядковый номер из счетчика в базе данных и сохраняется в
+    журнале, а процессы применяют пропущенные изменения по порядку при
+    следующем обращении. Если журнал отстал больше чем на max_replay
+    записей, запись вытеснена из кеша или номер меньше учтенного
+    процессом (счетчик сброшен), структура перестраивается из базы
+    данных.
+    Изменения должны быть идемпотентными: изменение, уже учтенное при
+    построении, может быть применено повторно.
+    """
+
+    max_replay = 1000
+    log_timeout = 60 * 60
+
+    def __init__(self):
+        """Пустая структура без версии и позиции в журнале."""
+        super().__init__()
+        self._sequence = 0
+
+    @property
+    def sequence_key(self):
+        """Ключ счетчика записей журнала."""
+        return f'{self.version_key}:sequence'
+
+    def log_key(self, sequence):
+        """Ключ записи журнала с номером sequence."""
+        return f'{self.version_key}:log:{sequence}'
+
+    def apply(self, data, change):
+        """Применение изменения к построенной структуре."""
+        raise NotImplementedError
+
+    def publish(self, change):
+        """Запись изменения в журнал для всех процессов.
+
+        Номер записи выдается атомарным увеличением счетчика, поэтому
+        одновременные изменения разных процессов не получают один номер.
+        """
+        cache.set(
+            self.log_key(increment(self.sequence_key)), change,
+            self.log_timeout
+        )
+        self._checked = None
+
+    def get(self):
+        """Актуальная структура с примененными изменениями из журнала."""
+        data = self._data
+        if data is not None and self.is_checked():
+            return data
+        with self._lock:
+            self._checked = time.monotonic()
+            values = get_values(self.version_key, self.sequence_key)
+            version = values[self.version_key]
+            sequence = values[self.sequence_key]
+            if self._data is not None and self._version == version:
+                if sequence == self._sequence:
+                    return self._data
+                if self._sequence < sequence <= (
+                    self._sequence + self.max_replay
+                ):
+                    keys = [
+                        self.log_key(number)
+                        for number in range(self._sequence + 1, sequence + 1)
+                    ]
+                    changes = cache.get_many(keys)
+                    if len(changes) == len(keys):
+                        for key in keys:
+                            self.apply(self._data, changes[key])
+                        self._sequence = sequence
+                        return self._data
+            self._data = self.build()
+            self._version = version
+            self._sequence = sequence
+            return self._data
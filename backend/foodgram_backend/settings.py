@@ -9,6 +9,10 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 
 SECRET_KEY = os.getenv('SECRET_KEY', django.core.management.utils.get_random_secret_key())
 
+SHORT_CODE_KEY = os.getenv('SHORT_CODE_KEY', 'foodgram-short-code')
+
+TASKS_EAGER = os.getenv('TASKS_EAGER', 'False') == 'True'
+
 DEBUG = os.getenv('DJANGO_DEBUG', 'False') == 'True'
 
 ALLOWED_HOSTS = os.getenv('DJANGO_ALLOWED_HOSTS', '127.0.0.1').split(',')
@@ -33,6 +37,9 @@ INSTALLED_APPS = [
     'tags.apps.TagsConfig',
     'shopping_cart.apps.ShoppingCartConfig',
     'subscriptions.apps.SubscriptionsConfig',
+    'feed.apps.FeedConfig',
+    'tasks.apps.TasksConfig',
+    'counters.apps.CountersConfig',
 ]
 
 MIDDLEWARE = [
@@ -85,6 +92,26 @@ else:
     }
 
 
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'foodgram_cache',
+            'OPTIONS': {
+                'MAX_ENTRIES': 100000,
+                'CULL_FREQUENCY': 10,
+            },
+        }
+    }
+
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -118,6 +145,15 @@ STATIC_ROOT = BASE_DIR / 'collected_static/static'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+STORAGES = {
+    'default': {
+        'BACKEND': 'foodgram_backend.storage.ContentAddressedStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
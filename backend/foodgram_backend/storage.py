@@ -0,0 +1,41 @@
+"""Хранилище загруженных файлов с именами по хешу содержимого."""
+import hashlib
+import posixpath
+
+from django.core.files.base import File
+from django.core.files.storage import FileSystemStorage
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Файловое хранилище, называющее файлы по SHA-256 содержимого.
+
+    Одинаковые файлы в одном каталоге хранятся один раз, а содержимое
+    файла с заданным именем никогда не меняется, поэтому ссылки можно
+    кешировать бессрочно. Файлы, на которые больше не ссылаются объекты,
+    удаляет команда collect_orphan_media.
+    """
+
+    def save(self, name, content, max_length=None):
+        """Сохранение файла под именем из хеша содержимого.
+
+        Если такой файл уже есть, он не перезаписывается.
+        """
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.get_hashed_name(name, content)
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length)
+
+    @staticmethod
+    def get_hashed_name(name, content):
+        """Имя файла из каталога name, хеша содержимого и расширения."""
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        directory, file_name = posixpath.split(name)
+        extension = posixpath.splitext(file_name)[1].lower()
+        return posixpath.join(directory, digest.hexdigest() + extension)
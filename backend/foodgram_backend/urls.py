@@ -2,7 +2,7 @@
 from django.contrib import admin
 from django.urls import include, path
 
-from api.views import short_recipe_url
+from recipes.views import short_recipe_url
 
 urlpatterns = [
     path('admin/', admin.site.urls),
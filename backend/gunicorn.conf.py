@@ -0,0 +1,16 @@
+"""Настройки gunicorn."""
+bind = '0.0.0.0:9000'
+
+
+def post_worker_init(worker):
+    """Построение индексов в памяти запущенного рабочего процесса.
+
+    Хук выполняется после загрузки приложения в каждом рабочем процессе,
+    поэтому главный процесс, в том числе с --preload, не обращается к
+    базе данных, а индексы строятся в фоновых потоках до первого запроса.
+    """
+    from ingredients.search import ingredient_index
+    from recipes.indexes import recipe_index
+
+    for index in (ingredient_index, recipe_index):
+        index.warm_up()
@@ -8,3 +8,7 @@ class IngredientsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ingredients'
     verbose_name = 'Ингредиенты'
+
+    def ready(self):
+        """Подключение сигналов приложения."""
+        import ingredients.signals  # noqa: F401
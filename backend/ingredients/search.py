@@ -0,0 +1,114 @@
+"""Поиск ингредиентов по названию в памяти процесса."""
+import heapq
+from array import array
+from bisect import bisect_left
+from collections import defaultdict
+
+from foodgram_backend.constants import (FUZZY_SEARCH_MAX_QUERY_LENGTH,
+                                        FUZZY_SEARCH_MIN_SIMILARITY)
+from foodgram_backend.indexes import LocalIndex
+from ingredients.models import Ingredient
+
+
+def fold(text):
+    """Приведение строки к виду для сравнения без учета регистра."""
+    return text.casefold().replace('ё', 'е')
+
+
+def trigrams(key):
+    """Множество триграмм строки, дополненной пробелами по краям."""
+    padded = f'  {key} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class IngredientSearchIndex(LocalIndex):
+    """Отсортированный индекс названий ингредиентов.
+
+    Поиск по началу названия выполняется бинарным поиском, по вхождению
+    подстроки - проходом по уже приведенным к нижнему регистру ключам,
+    без обращения к базе данных. Для нечеткого поиска хранится
+    инвертированный индекс триграмм: для каждой триграммы - массив
+    позиций ингредиентов, в названии которых она встречается.
+    """
+
+    version_key = 'ingredients:version'
+
+    def build(self):
+        """Ключи поиска и данные ингредиентов, упорядоченные по ключу."""
+        rows = sorted(
+            (fold(name), name, pk, measurement_unit)
+            for pk, name, measurement_unit in Ingredient.objects.values_list(
+                'id', 'name', 'measurement_unit'
+            )
+        )
+        keys = [key for key, *_ in rows]
+        postings = defaultdict(lambda: array('I'))
+        trigram_counts = array('H')
+        for position, key in enumerate(keys):
+            key_trigrams = trigrams(key)
+            trigram_counts.append(len(key_trigrams))
+            for trigram in key_trigrams:
+                postings[trigram].append(position)
+        return (
+            keys,
+            [
+                {'id': pk, 'name': name, 'measurement_unit': measurement_unit}
+                for _, name, pk, measurement_unit in rows
+            ],
+            dict(postings),
+            trigram_counts,
+        )
+
+    def search(self, query, limit):
+        """Ингредиенты, начинающиеся с query, затем содержащие query."""
+        keys, items, *_ = self.get()
+        query = fold(query.strip())
+        found = []
+        position = bisect_left(keys, query)
+        while (
+            position < len(keys) and len(found) < limit
+            and keys[position].startswith(query)
+        ):
+            found.append(items[position])
+            position += 1
+        for key, item in zip(keys, items):
+            if len(found) >= limit:
+                break
+            if query in key and not key.startswith(query):
+                found.append(item)
+        return found
+
+    def fuzzy_search(self, query, limit):
+        """Поиск с опечатками по сходству множеств триграмм.
+
+        Сначала возвращаются точные совпадения, затем ингредиенты
+        с наибольшим коэффициентом Дайса по триграммам. Длина запроса
+        ограничена, поэтому время поиска не зависит от ввода.
+        """
+        found = self.search(query, limit)
+        if len(found) >= limit:
+            return found
+        _, items, postings, trigram_counts = self.get()
+        query_trigrams = trigrams(
+            fold(query.strip())[:FUZZY_SEARCH_MAX_QUERY_LENGTH]
+        )
+        common = defaultdict(int)
+        for trigram in query_trigrams:
+            for position in postings.get(trigram, ()):
+                common[position] += 1
+        found_ids = {item['id'] for item in found}
+        scored = (
+            (2 * count / (len(query_trigrams) + trigram_counts[position]),
+             position)
+            for position, count in common.items()
+            if items[position]['id'] not in found_ids
+        )
+        return found + [
+            items[position] for similarity, position in heapq.nlargest(
+                limit - len(found), scored
+            )
+            if similarity >= FUZZY_SEARCH_MIN_SIMILARITY
+        ]
+
+
+ingredient_index = IngredientSearchIndex()
@@ -0,0 +1,14 @@
+"""Сигналы приложения ingredients."""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from ingredients.models import Ingredient
+from ingredients.search import ingredient_index
+from ingredients.units import conversion_table
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_ingredient_indexes(**kwargs):
+    """Сброс построенных по ингредиентам структур при их изменении."""
+    conversion_table.invalidate()
+    ingredient_index.invalidate()
@@ -0,0 +1,97 @@
+"""Единицы измерения ингредиентов и приведение количеств."""
+import numpy as np
+
+from foodgram_backend.indexes import LocalIndex
+from ingredients.models import Ingredient
+
+# Единица измерения: (каноническая единица, множитель приведения).
+UNITS = {
+    'г': ('г', 1),
+    'г.': ('г', 1),
+    'гр': ('г', 1),
+    'гр.': ('г', 1),
+    'грамм': ('г', 1),
+    'кг': ('г', 1000),
+    'кг.': ('г', 1000),
+    'килограмм': ('г', 1000),
+    'мл': ('мл', 1),
+    'мл.': ('мл', 1),
+    'миллилитр': ('мл', 1),
+    'л': ('мл', 1000),
+    'л.': ('мл', 1000),
+    'литр': ('мл', 1000),
+}
+
+
+def normalize_unit(measurement_unit):
+    """Каноническая единица и множитель для единицы измерения.
+
+    Единицы, отсутствующие в реестре (шт., ч. л. и т.п.), не приводятся.
+    """
+    return UNITS.get(
+        measurement_unit.strip().lower(), (measurement_unit, 1)
+    )
+
+
+class ConversionTableData:
+    """Массивы приведения, упорядоченные по Ingredient.id.
+
+    ranks - место ингредиента в списке, отсортированном по названию и
+    канонической единице.
+    """
+
+    def __init__(self, rows):
+        """Таблица из строк (id, название, единица измерения)."""
+        rows = sorted(rows)
+        self.ids = np.array([pk for pk, _, _ in rows], dtype=np.int64)
+        self.names = [name for _, name, _ in rows]
+        units = [normalize_unit(unit) for _, _, unit in rows]
+        self.units = [unit for unit, _ in units]
+        self.factors = np.array(
+            [factor for _, factor in units], dtype=np.int64
+        )
+        self.ranks = np.empty(len(rows), dtype=np.int64)
+        self.ranks[
+            sorted(range(len(rows)), key=lambda i: (
+                self.names[i], self.units[i]
+            ))
+        ] = np.arange(len(rows))
+
+
+class UnitConversionTable(LocalIndex):
+    """Таблица приведения количеств, индексированная по Ingredient.id."""
+
+    version_key = 'ingredients:version'
+
+    def build(self):
+        """Название, каноническая единица и множитель каждого ингредиента."""
+        return ConversionTableData(Ingredient.objects.values_list(
+            'id', 'name', 'measurement_unit'
+        ))
+
+
+conversion_table = UnitConversionTable()
+
+
+def aggregate_amounts(totals):
+    """Приведение сумм количеств ингредиентов к каноническим единицам.
+
+    Принимает пары (id ингредиента, количество), просуммированные в базе
+    данных, и возвращает отсортированный список (название, единица,
+    количество). Приведение выполняется над всем списком сразу по
+    массивам таблицы. Строки не объединяются: у ингредиента одна единица
+    измерения, а названия уникальны, поэтому каждому ингредиенту
+    соответствует ровно одна строка, а приведение только выражает массу
+    в граммах и объем в миллилитрах.
+    """
+    table = conversion_table.get()
+    totals = np.array(list(totals), dtype=np.int64).reshape(-1, 2)
+    positions = np.searchsorted(table.ids, totals[:, 0])
+    amounts = totals[:, 1] * table.factors[positions]
+    order = np.argsort(table.ranks[positions])
+    return [
+        (table.names[position], table.units[position], amount)
+        for position, amount in zip(
+            positions[order].tolist(), amounts[order].tolist()
+        )
+    ]
@@ -1,7 +1,14 @@
 """Админ-зона приложения recipes."""
+from functools import partial
+
 from django.contrib import admin
+from django.db import transaction
 
+from api.shopping_list import invalidate_recipe_shopping_lists
+from feed.timeline import fan_out_recipe
+from recipes.indexes import recipe_index
 from recipes.models import Recipe, RecipeIngredient
+from recipes.search import update_search_documents
 
 
 class RecipeIngredientInline(admin.TabularInline):
@@ -21,23 +28,39 @@ class RecipeAdmin(admin.ModelAdmin):
     """Модель админ-зоны Recipe."""
 
     list_display = (
-        'name', 'get_author_username', 'date_created'
+        'name', 'get_author_username', 'date_created', 'favorites_count',
+        'views_count', 'short_link_clicks'
     )
     list_select_related = ('author',)
     search_fields = ('name', 'author__username')
     list_filter = ('tags', 'date_created', 'cooking_time')
     inlines = (RecipeIngredientInline,)
-    readonly_fields = ('favorite_count',)
+    readonly_fields = (
+        'favorites_count', 'in_carts_count', 'views_count',
+        'short_link_clicks'
+    )
+
+    def save_related(self, request, form, formsets, change):
+        """Обновление индексов, лент и списков покупок после сохранения."""
+        super().save_related(request, form, formsets, change)
+        recipe = form.instance
+        update_search_documents((recipe.id,))
+        recipe_index.update_recipe(
+            recipe.id,
+            recipe.ingredients.values_list('ingredient_id', flat=True),
+            recipe.tags.values_list('id', flat=True)
+        )
+        if not change:
+            fan_out_recipe(recipe)
+        else:
+            transaction.on_commit(partial(
+                invalidate_recipe_shopping_lists, (recipe.id,)
+            ))
 
     @admin.display(description='Автор')
     def get_author_username(self, obj):
         """Получение имени пользователя автора."""
         return obj.author.username
 
-    @admin.display(description='Добавлено в избранное')
-    def favorite_count(self, obj):
-        """Количество добавлений рецепта в избранное."""
-        return obj.favorited_by.count()
-
 
 admin.site.register(Recipe, RecipeAdmin)
@@ -0,0 +1,147 @@
+"""Счетчики просмотров рецептов и переходов по коротким ссылкам.
+
+Обращения считаются в памяти процесса и раз в ANALYTICS_FLUSH_INTERVAL
+секунд или после ANALYTICS_FLUSH_SIZE обращений передаются фоновым
+потоком в очередь задач одной задачей. Задача записывает их одним
+запросом UPDATE ... FROM (VALUES ...) на пачку рецептов; задачи записи
+выполняются по одной, чтобы их обновления одних и тех же строк не
+блокировали друг друга. Обработка запроса не ждет записи.
+"""
+import atexit
+import os
+import threading
+
+from django.db import DatabaseError, connection, transaction
+
+from foodgram_backend.constants import (ANALYTICS_FLUSH_INTERVAL,
+                                        ANALYTICS_FLUSH_SIZE)
+from tasks.queue import task
+
+BATCH_SIZE = 300
+
+UPDATE_SQL = '''
+    UPDATE recipes_recipe SET {assignments}
+    FROM (VALUES {values}) AS hits
+    WHERE recipes_recipe.id = hits.column1
+'''
+
+HIT_FIELDS = ('views_count', 'short_link_clicks')
+
+
+@task(concurrency=1, atomic=True)
+def apply_hits(items):
+    """Запись обращений [id рецепта, *счетчики HIT_FIELDS] в базу данных.
+
+    Пачки записываются в одной транзакции с удалением задачи из очереди,
+    поэтому при повторе задачи обращения не учитываются дважды.
+    """
+    assignments = ', '.join(
+        f'{field} = {field} + hits.column{number}'
+        for number, field in enumerate(HIT_FIELDS, start=2)
+    )
+    row = f'({", ".join(["%s"] * (len(HIT_FIELDS) + 1))})'
+    with transaction.atomic(), connection.cursor() as cursor:
+        for start in range(0, len(items), BATCH_SIZE):
+            batch = items[start:start + BATCH_SIZE]
+            cursor.execute(
+                UPDATE_SQL.format(
+                    assignments=assignments,
+                    values=', '.join([row] * len(batch))
+                ),
+                [value for item in batch for value in item]
+            )
+
+
+class HitCounter:
+    """Накопитель обращений к рецептам в памяти процесса.
+
+    Фоновый поток создается при первом обращении в процессе, поэтому
+    счетчики корректно работают и в процессах, созданных через fork.
+    """
+
+    fields = HIT_FIELDS
+
+    def __init__(self):
+        """Накопитель без запущенного потока записи."""
+        self._start_lock = threading.Lock()
+        self._pid = None
+
+    def _start(self):
+        """Создание накопителя и потока записи в текущем процессе."""
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._counts = {}
+        self._pending = 0
+        self._pid = os.getpid()
+        threading.Thread(
+            target=self._run, name='recipe-hit-counter', daemon=True
+        ).start()
+        atexit.register(self._flush_quietly)
+
+    def record(self, recipe_id, field):
+        """Учет обращения к рецепту по счетчику field."""
+        if self._pid != os.getpid():
+            with self._start_lock:
+                if self._pid != os.getpid():
+                    self._start()
+        with self._lock:
+            hits = self._counts.setdefault(
+                recipe_id, [0] * len(self.fields)
+            )
+            hits[self.fields.index(field)] += 1
+            self._pending += 1
+            if self._pending >= ANALYTICS_FLUSH_SIZE:
+                self._wakeup.set()
+
+    def _run(self):
+        """Цикл потока записи накопленных обращений."""
+        while True:
+            self._wakeup.wait(ANALYTICS_FLUSH_INTERVAL)
+            self._wakeup.clear()
+            try:
+                self._flush_quietly()
+            finally:
+                connection.close()
+
+    def _flush_quietly(self):
+        """Передача обращений без выброса ошибок базы данных."""
+        try:
+            self.flush()
+        except DatabaseError:
+            pass
+
+    def flush(self):
+        """Передача накопленных обращений в очередь задач.
+
+        При ошибке постановки в очередь обращения возвращаются в
+        накопитель и будут переданы при следующей попытке.
+        """
+        if self._pid != os.getpid():
+            return
+        with self._lock:
+            counts, self._counts = self._counts, {}
+            self._pending = 0
+        items = list(counts.items())
+        if not items:
+            return
+        try:
+            apply_hits.enqueue(
+                [[recipe_id, *hits] for recipe_id, hits in items]
+            )
+        except DatabaseError:
+            self._restore(items)
+            raise
+
+    def _restore(self, items):
+        """Возврат не записанных обращений в накопитель."""
+        with self._lock:
+            for recipe_id, hits in items:
+                current = self._counts.setdefault(
+                    recipe_id, [0] * len(self.fields)
+                )
+                for index, value in enumerate(hits):
+                    current[index] += value
+                self._pending += sum(hits)
+
+
+hit_counter = HitCounter()
@@ -8,3 +8,7 @@ class RecipesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recipes'
     verbose_name = 'Рецепты'
+
+    def ready(self):
+        """Подключение сигналов приложения."""
+        import recipes.signals  # noqa: F401
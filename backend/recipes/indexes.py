@@ -0,0 +1,244 @@
+"""Индексы рецептов по ингредиентам и тегам в памяти процесса."""
+import numpy as np
+
+from foodgram_backend.constants import SIMILAR_RECIPES_TAG_WEIGHT
+from foodgram_backend.indexes import IncrementalLocalIndex
+from recipes.models import Recipe, RecipeIngredient
+
+
+class FeaturePostings:
+    """Инвертированный индекс признак -> позиции рецептов.
+
+    Вместе с позициями хранится число признаков каждого рецепта, то есть
+    разреженная матрица рецепт x признак в виде массивов по столбцам.
+    """
+
+    def __init__(self):
+        """Пустой индекс признаков."""
+        self.postings = {}
+        self.features = {}
+        self.counts = np.zeros(0, dtype=np.int32)
+
+    @classmethod
+    def from_pairs(cls, positions, feature_ids, capacity):
+        """Индекс по массивам пар (позиция рецепта, признак).
+
+        Пары сортируются по признаку один раз и делятся на массивы
+        позиций, поэтому построение, в отличие от вставок через set, не
+        копирует массивы для каждого рецепта.
+        """
+        postings = cls()
+        postings.counts = np.zeros(capacity, dtype=np.int32)
+        if not len(positions):
+            return postings
+        pairs = np.unique(
+            np.asarray(feature_ids, dtype=np.int64) * capacity + positions
+        )
+        features, positions = np.divmod(pairs, capacity)
+        positions = positions.astype(np.int32)
+        feature_ids, starts = np.unique(features, return_index=True)
+        postings.postings = dict(zip(
+            feature_ids.tolist(), np.split(positions, starts[1:])
+        ))
+        order = np.argsort(positions, kind='stable')
+        recipe_positions, starts = np.unique(
+            positions[order], return_index=True
+        )
+        ids = features[order].tolist()
+        bounds = [*starts.tolist(), len(ids)]
+        postings.features = {
+            position: frozenset(ids[start:end])
+            for position, start, end in zip(
+                recipe_positions.tolist(), bounds, bounds[1:]
+            )
+        }
+        postings.counts[:] = np.bincount(positions, minlength=capacity)
+        return postings
+
+    def resize(self, capacity):
+        """Расширение массива числа признаков до capacity рецептов."""
+        size = len(self.counts)
+        self.counts = np.resize(self.counts, capacity)
+        self.counts[size:] = 0
+
+    def set(self, position, feature_ids):
+        """Замена набора признаков рецепта в позиции position."""
+        old = self.features.get(position, frozenset())
+        new = frozenset(feature_ids)
+        for feature_id in old - new:
+            postings = self.postings[feature_id]
+            self.postings[feature_id] = postings[postings != position]
+        for feature_id in new - old:
+            self.postings[feature_id] = np.append(
+                self.postings.get(feature_id, np.zeros(0, dtype=np.int32)),
+                np.int32(position)
+            )
+        if new:
+            self.features[position] = new
+        else:
+            self.features.pop(position, None)
+        self.counts[position] = len(new)
+
+    def matches(self, feature_ids, size):
+        """Число совпавших признаков из набора у каждого рецепта."""
+        postings = [
+            self.postings[feature_id] for feature_id in feature_ids
+            if feature_id in self.postings
+        ]
+        if not postings:
+            return np.zeros(size, dtype=np.int64)
+        return np.bincount(np.concatenate(postings), minlength=size)
+
+
+class RecipeIndexData:
+    """Индексы рецептов по ингредиентам и тегам.
+
+    Рецепту соответствует позиция в массивах. Совпадения по набору
+    признаков считаются векторно через np.bincount по массивам позиций,
+    без обхода связей рецептов.
+    """
+
+    def __init__(self):
+        """Пустой индекс."""
+        self.positions = {}
+        self.recipe_ids = np.zeros(0, dtype=np.int64)
+        self.ingredients = FeaturePostings()
+        self.tags = FeaturePostings()
+        self.size = 0
+
+    @classmethod
+    def from_pairs(cls, ingredient_pairs, tag_pairs):
+        """Индекс по парам (id рецепта, id ингредиента или тега).
+
+        Позиции рецептов назначаются по отсортированным id векторно.
+        """
+        data = cls()
+        ingredient_pairs = np.array(ingredient_pairs, dtype=np.int64)
+        tag_pairs = np.array(tag_pairs, dtype=np.int64)
+        ingredient_pairs.shape = tag_pairs.shape = (-1, 2)
+        recipe_ids = np.unique(
+            np.concatenate((ingredient_pairs[:, 0], tag_pairs[:, 0]))
+        )
+        data.size = len(recipe_ids)
+        capacity = max(2 * data.size, 64)
+        data.recipe_ids = np.zeros(capacity, dtype=np.int64)
+        data.recipe_ids[:data.size] = recipe_ids
+        data.positions = dict(zip(recipe_ids.tolist(), range(data.size)))
+        data.ingredients = FeaturePostings.from_pairs(
+            np.searchsorted(recipe_ids, ingredient_pairs[:, 0]),
+            ingredient_pairs[:, 1], capacity
+        )
+        data.tags = FeaturePostings.from_pairs(
+            np.searchsorted(recipe_ids, tag_pairs[:, 0]),
+            tag_pairs[:, 1], capacity
+        )
+        return data
+
+    def position(self, recipe_id):
+        """Позиция рецепта; для нового рецепта массивы расширяются."""
+        if recipe_id in self.positions:
+            return self.positions[recipe_id]
+        if self.size == len(self.recipe_ids):
+            capacity = max(2 * self.size, 64)
+            self.recipe_ids = np.resize(self.recipe_ids, capacity)
+            self.ingredients.resize(capacity)
+            self.tags.resize(capacity)
+        position = self.size
+        self.positions[recipe_id] = position
+        self.recipe_ids[position] = recipe_id
+        self.size += 1
+        return position
+
+    def set_recipe(self, recipe_id, ingredient_ids, tag_ids):
+        """Замена ингредиентов и тегов рецепта."""
+        position = self.position(recipe_id)
+        self.ingredients.set(position, ingredient_ids)
+        self.tags.set(position, tag_ids)
+
+
+class RecipeIndex(IncrementalLocalIndex):
+    """Индекс рецептов по ингредиентам и тегам с журналом изменений."""
+
+    version_key = 'recipes:index:version'
+
+    def build(self):
+        """Построение индекса двумя запросами к таблицам связей."""
+        return RecipeIndexData.from_pairs(
+            list(RecipeIngredient.objects.values_list(
+                'recipe_id', 'ingredient_id'
+            ).order_by()),
+            list(Recipe.tags.through.objects.values_list(
+                'recipe_id', 'tag_id'
+            ).order_by())
+        )
+
+    def apply(self, data, change):
+        """Применение изменения (id рецепта, id ингредиентов, id тегов)."""
+        data.set_recipe(*change)
+
+    def update_recipe(self, recipe_id, ingredient_ids, tag_ids):
+        """Публикация нового набора ингредиентов и тегов рецепта."""
+        self.publish((recipe_id, tuple(ingredient_ids), tuple(tag_ids)))
+
+    def delete_recipe(self, recipe_id):
+        """Публикация удаления рецепта."""
+        self.publish((recipe_id, (), ()))
+
+    def pantry(self, ingredient_ids, limit):
+        """Рецепты, которые можно приготовить из имеющихся ингредиентов.
+
+        Возвращает до limit пар (id рецепта, доля имеющихся ингредиентов,
+        id недостающих ингредиентов), упорядоченных по убыванию доли
+        и числа совпавших ингредиентов.
+        """
+        data = self.get()
+        owned = frozenset(ingredient_ids)
+        matches = data.ingredients.matches(owned, data.size)
+        counts = data.ingredients.counts[:data.size]
+        candidates = np.flatnonzero(matches)
+        if not len(candidates):
+            return []
+        coverage = matches[candidates] / counts[candidates]
+        order = np.lexsort((-matches[candidates], -coverage))[:limit]
+        return [
+            (
+                int(data.recipe_ids[candidates[index]]),
+                float(coverage[index]),
+                sorted(
+                    data.ingredients.features[candidates[index]] - owned
+                ),
+            )
+            for index in order
+        ]
+
+    def similar(self, recipe_id, limit):
+        """Id рецептов, ближайших к рецепту по ингредиентам и тегам.
+
+        Близость - косинусная мера между бинарными векторами признаков,
+        в которых теги учитываются с весом SIMILAR_RECIPES_TAG_WEIGHT.
+        Возвращает None, если рецепта нет в индексе.
+        """
+        data = self.get()
+        position = data.positions.get(recipe_id)
+        if position is None or not data.ingredients.counts[position]:
+            return None
+        weight = SIMILAR_RECIPES_TAG_WEIGHT ** 2
+        shared = data.ingredients.matches(
+            data.ingredients.features.get(position, ()), data.size
+        ) + weight * data.tags.matches(
+            data.tags.features.get(position, ()), data.size
+        )
+        norms = np.sqrt(
+            data.ingredients.counts[:data.size]
+            + weight * data.tags.counts[:data.size]
+        )
+        shared[position] = 0
+        candidates = np.flatnonzero(shared)
+        if not len(candidates):
+            return []
+        scores = shared[candidates] / (norms[candidates] * norms[position])
+        order = np.argsort(-scores, kind='stable')[:limit]
+        return [int(data.recipe_ids[candidates[index]]) for index in order]
+
+
+recipe_index = RecipeIndex()
@@ -0,0 +1,37 @@
+"""Заполнение отсутствующих коротких кодов рецептов."""
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from recipes.models import Recipe
+from recipes.short_codes import encode_short_code
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    """Сохранение выведенных из id коротких кодов рецептов без кода."""
+
+    help = (
+        'Сохраняет выведенные из id короткие коды рецептов, у которых '
+        'код не заполнен, например после загрузки фикстур. Ранее '
+        'выданные коды не изменяются и продолжают работать.'
+    )
+
+    def handle(self, *args, **options):
+        """Заполнение кодов пачками."""
+        recipe_ids = list(Recipe.objects.filter(
+            Q(short_code__isnull=True) | Q(short_code='')
+        ).values_list('id', flat=True))
+        for start in range(0, len(recipe_ids), BATCH_SIZE):
+            Recipe.objects.bulk_update(
+                [
+                    Recipe(
+                        id=recipe_id, short_code=encode_short_code(recipe_id)
+                    )
+                    for recipe_id in recipe_ids[start:start + BATCH_SIZE]
+                ],
+                ('short_code',)
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Заполнено коротких кодов: {len(recipe_ids)}.'
+        ))
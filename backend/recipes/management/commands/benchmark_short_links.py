@@ -0,0 +1,84 @@
+"""Замер пропускной способности переходов по коротким ссылкам."""
+import time
+from unittest import mock
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.http import HttpResponseRedirect
+from django.shortcuts import get_object_or_404
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from rest_framework.decorators import api_view
+
+from recipes.analytics import hit_counter
+from recipes.models import Recipe
+from recipes.views import short_recipe_url
+
+SAMPLE_SIZE = 100
+
+
+@api_view(('GET',))
+def drf_short_recipe_url(request, encoded):
+    """Прежнее представление DRF с запросом рецепта на каждый переход."""
+    recipe = get_object_or_404(Recipe, short_code=encoded)
+    return HttpResponseRedirect(f'/recipes/{recipe.id}/')
+
+
+class Command(BaseCommand):
+    """Сравнение прежнего и текущего представлений коротких ссылок."""
+
+    help = (
+        'Вызывает прежнее представление DRF и текущее представление '
+        'коротких ссылок для сохраненных кодов рецептов и выводит число '
+        'переходов в секунду и число запросов к базе данных на переход. '
+        'Переходы не учитываются в счетчиках рецептов.'
+    )
+
+    def add_arguments(self, parser):
+        """Аргументы команды."""
+        parser.add_argument(
+            '--requests', type=int, default=5000,
+            help='Число переходов для каждого представления.'
+        )
+
+    def handle(self, *args, **options):
+        """Замер обоих представлений на одних и тех же кодах.
+
+        Учет переходов отключается на время замера, чтобы тестовые
+        переходы не попали в short_link_clicks.
+        """
+        codes = list(Recipe.objects.filter(
+            short_code__isnull=False
+        ).values_list('short_code', flat=True)[:SAMPLE_SIZE])
+        if not codes:
+            raise CommandError(
+                'Нет рецептов с короткими кодами, выполните '
+                'backfill_short_codes.'
+            )
+        factory = RequestFactory()
+        with mock.patch.object(
+            hit_counter, 'record', lambda recipe_id, field: None
+        ):
+            self.benchmark(factory, codes, options['requests'])
+
+    def benchmark(self, factory, codes, requests):
+        """Замер переходов для каждого представления."""
+        for name, view in (
+            ('DRF api_view', drf_short_recipe_url),
+            ('Django view', short_recipe_url),
+        ):
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                for number in range(requests):
+                    code = codes[number % len(codes)]
+                    response = view(factory.get(f'/s/{code}/'), encoded=code)
+                    if response.status_code != 302:
+                        raise CommandError(
+                            f'{name}: код {code} вернул '
+                            f'{response.status_code}.'
+                        )
+                elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f'{name}: {requests / elapsed:.0f} переходов/с, '
+                f'{len(queries) / requests:.3f} запросов на переход'
+            )
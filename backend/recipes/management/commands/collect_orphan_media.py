@@ -0,0 +1,91 @@
+"""Удаление загруженных файлов, на которые не ссылаются объекты."""
+import posixpath
+from datetime import timedelta
+
+from django.apps import apps
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import models
+from django.utils import timezone
+
+from foodgram_backend.constants import (IMAGE_DERIVATIVES_PATH,
+                                        MEDIA_ORPHAN_MIN_AGE)
+from foodgram_backend.images import image_derivatives
+
+
+def walk(storage, directory):
+    """Имена всех файлов каталога хранилища и его подкаталогов."""
+    try:
+        directories, files = storage.listdir(directory)
+    except FileNotFoundError:
+        return
+    for file_name in files:
+        yield posixpath.join(directory, file_name)
+    for name in directories:
+        yield from walk(storage, posixpath.join(directory, name))
+
+
+class Command(BaseCommand):
+    """Сборка файлов, оставшихся после замены и удаления изображений."""
+
+    help = (
+        'Удаляет из каталогов загрузки файлы, на которые не ссылается ни '
+        'один объект, и копии изображений, которых нет в списках копий '
+        'объектов, в том числе замененные при пересоздании. Файлы моложе '
+        f'{MEDIA_ORPHAN_MIN_AGE} секунд не удаляются: их объекты могут '
+        'быть еще не сохранены.'
+    )
+
+    def add_arguments(self, parser):
+        """Аргументы команды."""
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только вывести файлы, которые будут удалены.'
+        )
+
+    def handle(self, *args, **options):
+        """Поиск и удаление неиспользуемых файлов."""
+        referenced = set()
+        directories = {IMAGE_DERIVATIVES_PATH}
+        for model in apps.get_models():
+            for field in model._meta.get_fields():
+                if (
+                    not isinstance(field, models.FileField)
+                    or field.storage is not default_storage
+                ):
+                    continue
+                if isinstance(field.upload_to, str):
+                    directories.add(field.upload_to.strip('/'))
+                referenced.update(
+                    model.objects.exclude(**{field.name: ''}).exclude(
+                        **{f'{field.name}__isnull': True}
+                    ).values_list(field.name, flat=True)
+                )
+        for model, _, derivatives_field_name in image_derivatives.fields:
+            for derivatives in model.objects.exclude(
+                **{derivatives_field_name: []}
+            ).values_list(derivatives_field_name, flat=True):
+                referenced.update(
+                    name
+                    for derivative in derivatives
+                    for key, name in derivative.items() if key != 'width'
+                )
+        min_modified = timezone.now() - timedelta(
+            seconds=MEDIA_ORPHAN_MIN_AGE
+        )
+        removed = 0
+        for directory in directories:
+            for name in walk(default_storage, directory):
+                if (
+                    name in referenced
+                    or default_storage.get_modified_time(name) > min_modified
+                ):
+                    continue
+                if options['dry_run']:
+                    self.stdout.write(name)
+                else:
+                    default_storage.delete(name)
+                removed += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Неиспользуемых файлов: {removed}.'
+        ))
@@ -0,0 +1,43 @@
+"""Создание уменьшенных копий загруженных изображений."""
+from django.core.management.base import BaseCommand
+
+from foodgram_backend.images import image_derivatives, update_derivatives
+
+
+class Command(BaseCommand):
+    """Создание копий изображений, у которых их еще нет."""
+
+    help = (
+        'Создает уменьшенные копии изображений рецептов и аватаров, '
+        'у которых их нет, например после загрузки фикстур. С --all '
+        'копии пересоздаются для всех изображений, измененные копии '
+        'сохраняются под новыми именами.'
+    )
+
+    def add_arguments(self, parser):
+        """Аргументы команды."""
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Пересоздать копии всех изображений.'
+        )
+
+    def handle(self, *args, **options):
+        """Создание копий в текущем процессе."""
+        created = 0
+        for model, field_name, derivatives_field_name in (
+            image_derivatives.fields
+        ):
+            objects = model.objects.exclude(
+                **{f'{field_name}__isnull': True}
+            ).exclude(**{field_name: ''})
+            if not options['all']:
+                objects = objects.filter(**{derivatives_field_name: []})
+            for pk, name in objects.values_list('pk', field_name):
+                update_derivatives(
+                    model._meta.label, pk, field_name, derivatives_field_name,
+                    name
+                )
+                created += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано изображений: {created}.'
+        ))
@@ -0,0 +1,30 @@
+"""Пересборка индекса рецептов по ингредиентам и тегам."""
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes.indexes import recipe_index
+
+
+class Command(BaseCommand):
+    """Пересборка индекса рецептов во всех процессах."""
+
+    help = (
+        'Сбрасывает индекс рецептов по ингредиентам и тегам во всех '
+        'процессах и проверяет его построение из таблиц связей. '
+        'Веб-процессы строят индекс при запуске и после сброса - при '
+        'следующем обращении.'
+    )
+
+    def handle(self, *args, **options):
+        """Сброс версии индекса и проверочное построение с замером."""
+        recipe_index.invalidate()
+        start = time.monotonic()
+        data = recipe_index.get()
+        self.stdout.write(self.style.SUCCESS(
+            f'Индекс рецептов пересобран за '
+            f'{time.monotonic() - start:.2f} с: '
+            f'рецептов {len(data.positions)}, '
+            f'ингредиентов {len(data.ingredients.postings)}, '
+            f'тегов {len(data.tags.postings)}.'
+        ))
@@ -0,0 +1,26 @@
+"""Пересборка поисковых документов рецептов."""
+from django.core.management.base import BaseCommand
+
+from recipes.models import Recipe
+from recipes.search import update_search_documents
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    """Пересборка полнотекстового индекса всех рецептов."""
+
+    help = (
+        'Пересобирает поисковые документы рецептов, например после '
+        'создания поискового индекса миграцией, загрузки фикстур или '
+        'переименования ингредиентов.'
+    )
+
+    def handle(self, *args, **options):
+        """Пересборка документов пачками."""
+        recipe_ids = list(Recipe.objects.values_list('id', flat=True))
+        for start in range(0, len(recipe_ids), BATCH_SIZE):
+            update_search_documents(recipe_ids[start:start + BATCH_SIZE])
+        self.stdout.write(self.style.SUCCESS(
+            f'Поисковые документы пересобраны: {len(recipe_ids)}.'
+        ))
@@ -0,0 +1,60 @@
+"""Пересчет счетчиков избранного и списков покупок у рецептов."""
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from favorite.models import Favorite
+from recipes.models import Recipe
+from shopping_cart.models import ShoppingCart
+
+COUNTERS = (
+    ('favorites_count', Favorite),
+    ('in_carts_count', ShoppingCart),
+)
+
+
+def actual_counts():
+    """Выражения фактического количества связей для каждого счетчика."""
+    return {
+        field: Coalesce(Subquery(
+            model.objects.filter(recipe=OuterRef('pk'))
+            .values('recipe').annotate(total=Count('id')).values('total')
+        ), 0)
+        for field, model in COUNTERS
+    }
+
+
+class Command(BaseCommand):
+    """Пересчет денормализованных счетчиков Recipe одним запросом."""
+
+    help = (
+        'Пересчитывает поля favorites_count и in_carts_count рецептов. '
+        'С флагом --check только сообщает о расхождениях.'
+    )
+
+    def add_arguments(self, parser):
+        """Аргументы команды."""
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Только проверить счетчики, не изменяя их.'
+        )
+
+    def handle(self, *args, **options):
+        """Проверка и пересчет счетчиков."""
+        mismatched_count = Recipe.objects.annotate(**{
+            f'actual_{field}': expression
+            for field, expression in actual_counts().items()
+        }).exclude(**{
+            field: F(f'actual_{field}') for field, _ in COUNTERS
+        }).count()
+        if options['check']:
+            if mismatched_count:
+                raise CommandError(
+                    f'Расхождения счетчиков у {mismatched_count} рецептов.'
+                )
+            self.stdout.write(self.style.SUCCESS('Счетчики в порядке.'))
+            return
+        Recipe.objects.update(**actual_counts())
+        self.stdout.write(self.style.SUCCESS(
+            f'Счетчики пересчитаны, исправлено рецептов: {mismatched_count}.'
+        ))
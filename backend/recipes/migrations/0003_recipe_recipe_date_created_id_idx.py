@@ -0,0 +1,20 @@
+# Generated by Django 5.1.7 on 2026-10-18 19:38
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0002_initial'),
+        ('tags', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-date_created', '-id'], name='recipe_date_created_id_idx'),
+        ),
+    ]
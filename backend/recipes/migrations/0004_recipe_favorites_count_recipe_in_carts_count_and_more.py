@@ -0,0 +1,51 @@
+# Generated by Django 5.1.7 on 2026-10-18 19:39
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_counters(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    Favorite = apps.get_model('favorite', 'Favorite')
+    ShoppingCart = apps.get_model('shopping_cart', 'ShoppingCart')
+    Recipe.objects.update(**{
+        field: Coalesce(Subquery(
+            model.objects.filter(recipe=OuterRef('pk'))
+            .values('recipe').annotate(total=Count('id')).values('total')
+        ), 0)
+        for field, model in (
+            ('favorites_count', Favorite),
+            ('in_carts_count', ShoppingCart),
+        )
+    })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('favorite', '0003_initial'),
+        ('shopping_cart', '0002_initial'),
+        ('recipes', '0003_recipe_recipe_date_created_id_idx'),
+        ('tags', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Добавлений в избранное'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='in_carts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Добавлений в список покупок'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-favorites_count', '-date_created'], name='recipe_favorites_count_idx'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
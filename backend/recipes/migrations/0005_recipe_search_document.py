@@ -0,0 +1,51 @@
+from django.db import migrations
+
+POSTGRESQL_FORWARD = (
+    'ALTER TABLE recipes_recipe ADD COLUMN search_vector tsvector',
+    'CREATE INDEX recipe_search_vector_idx '
+    'ON recipes_recipe USING gin (search_vector)',
+)
+
+POSTGRESQL_BACKWARD = (
+    'DROP INDEX IF EXISTS recipe_search_vector_idx',
+    'ALTER TABLE recipes_recipe DROP COLUMN IF EXISTS search_vector',
+)
+
+SQLITE_FORWARD = (
+    "CREATE VIRTUAL TABLE recipes_recipe_fts USING fts5("
+    "name, text, ingredients, tokenize='unicode61 remove_diacritics 2')",
+    'CREATE TRIGGER recipes_recipe_fts_delete '
+    'AFTER DELETE ON recipes_recipe BEGIN '
+    'DELETE FROM recipes_recipe_fts WHERE rowid = old.id; END',
+)
+
+SQLITE_BACKWARD = (
+    'DROP TRIGGER IF EXISTS recipes_recipe_fts_delete',
+    'DROP TABLE IF EXISTS recipes_recipe_fts',
+)
+
+
+def execute(statements):
+    def operation(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, ()):
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ingredients', '0001_initial'),
+        ('recipes', '0004_recipe_favorites_count_recipe_in_carts_count_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            execute({
+                'postgresql': POSTGRESQL_FORWARD, 'sqlite': SQLITE_FORWARD
+            }),
+            execute({
+                'postgresql': POSTGRESQL_BACKWARD, 'sqlite': SQLITE_BACKWARD
+            }),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.7 on 2026-10-18 20:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_recipe_recipe_author_date_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='short_link_clicks',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Переходов по короткой ссылке'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='views_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Просмотров'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 20:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_recipe_short_link_clicks_recipe_views_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_derivatives',
+            field=models.JSONField(default=list, editable=False, verbose_name='Уменьшенные копии изображения'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 20:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_recipe_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='date_updated',
+            field=models.DateTimeField(auto_now=True, verbose_name='Дата изменения'),
+        ),
+    ]
@@ -1,7 +1,4 @@
 """Модели recipes."""
-import random
-import string
-
 from django.contrib.auth import get_user_model
 from django.core import validators
 from django.db import models
@@ -16,6 +13,7 @@ from foodgram_backend.constants import (AMOUNT_MAX_ERROR, AMOUNT_MIN_ERROR,
                                         RECIPE_NAME_MAX_LENGTH,
                                         SHORT_CODE_MAX_LENGTH)
 from ingredients.models import Ingredient
+from recipes.short_codes import encode_short_code
 from tags.models import Tag
 
 User = get_user_model()
@@ -72,6 +70,10 @@ class Recipe(models.Model):
     )
     text = models.TextField(verbose_name='Текст')
     image = models.ImageField(upload_to='recipes/', verbose_name='Изображение')
+    image_derivatives = models.JSONField(
+        default=list, editable=False,
+        verbose_name='Уменьшенные копии изображения'
+    )
     tags = models.ManyToManyField(
         Tag, related_name='recipes', verbose_name='Теги'
     )
@@ -90,6 +92,9 @@ class Recipe(models.Model):
         auto_now_add=True,
         verbose_name='Дата создания'
     )
+    date_updated = models.DateTimeField(
+        auto_now=True, verbose_name='Дата изменения'
+    )
     author = models.ForeignKey(
         User, on_delete=models.CASCADE,
         related_name='recipes', verbose_name='Автор'
@@ -98,6 +103,20 @@ class Recipe(models.Model):
         max_length=SHORT_CODE_MAX_LENGTH, unique=True,
         blank=True, null=True, verbose_name='Короткая ссылка'
     )
+    favorites_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Добавлений в избранное'
+    )
+    in_carts_count = models.PositiveIntegerField(
+        default=0, editable=False,
+        verbose_name='Добавлений в список покупок'
+    )
+    views_count = models.PositiveIntegerField(
+        default=0, editable=False, verbose_name='Просмотров'
+    )
+    short_link_clicks = models.PositiveIntegerField(
+        default=0, editable=False,
+        verbose_name='Переходов по короткой ссылке'
+    )
 
     class Meta:
         """Мета-информация Recipe."""
@@ -105,25 +124,34 @@ class Recipe(models.Model):
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ('-date_created', 'name')
+        indexes = (
+            models.Index(
+                fields=('-date_created', '-id'),
+                name='recipe_date_created_id_idx'
+            ),
+            models.Index(
+                fields=('-favorites_count', '-date_created'),
+                name='recipe_favorites_count_idx'
+            ),
+            models.Index(
+                fields=('author', '-date_created', '-id'),
+                name='recipe_author_date_idx'
+            ),
+        )
 
     def __str__(self):
         """Строковое представление рецепта."""
         return f'Рецепт {self.name}'
 
-    def generate_short_code(self):
-        """Генерация уникального короткого кода для рецепта."""
-        length = SHORT_CODE_MAX_LENGTH
-        characters = string.ascii_letters + string.digits
-        while True:
-            short_code = ''.join(
-                random.choice(characters) for _ in range(length)
-            )
-            if not Recipe.objects.filter(short_code=short_code).exists():
-                break
-        return short_code
+    def get_short_code(self):
+        """Короткий код рецепта: сохраненный или выведенный из id."""
+        return self.short_code or encode_short_code(self.pk)
 
     def save(self, *args, **kwargs):
-        """Добавление короткого кода только при создании рецепта."""
-        if not self.short_code:
-            self.short_code = self.generate_short_code()
+        """Сохранение кода, выведенного из id, при создании рецепта."""
         super().save(*args, **kwargs)
+        if not self.short_code:
+            self.short_code = encode_short_code(self.pk)
+            Recipe.objects.filter(pk=self.pk).update(
+                short_code=self.short_code
+            )
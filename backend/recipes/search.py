@@ -0,0 +1,101 @@
+"""Полнотекстовый поиск рецептов.
+
+Поисковый документ рецепта состоит из названия, текста и названий
+ингредиентов. В PostgreSQL он хранится в столбце search_vector типа
+tsvector с GIN-индексом, в SQLite - в виртуальной таблице FTS5
+recipes_recipe_fts. Структуры создаются миграцией
+0005_recipe_search_document.
+"""
+import re
+
+from django.db import connection
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+
+from foodgram_backend.constants import SEARCH_CONFIG
+
+POSTGRESQL_UPDATE_SQL = f'''
+    UPDATE recipes_recipe SET search_vector =
+        setweight(to_tsvector('{SEARCH_CONFIG}', recipes_recipe.name), 'A')
+        || setweight(to_tsvector('{SEARCH_CONFIG}', coalesce((
+            SELECT string_agg(ingredients_ingredient.name, ' ')
+            FROM recipes_recipeingredient
+            JOIN ingredients_ingredient
+                ON ingredients_ingredient.id
+                = recipes_recipeingredient.ingredient_id
+            WHERE recipes_recipeingredient.recipe_id = recipes_recipe.id
+        ), '')), 'B')
+        || setweight(to_tsvector('{SEARCH_CONFIG}', recipes_recipe.text), 'C')
+    WHERE recipes_recipe.id = ANY(%s)
+'''
+
+SQLITE_DELETE_SQL = '''
+    DELETE FROM recipes_recipe_fts WHERE rowid IN ({})
+'''
+
+SQLITE_INSERT_SQL = '''
+    INSERT INTO recipes_recipe_fts(rowid, name, text, ingredients)
+    SELECT recipes_recipe.id, recipes_recipe.name, recipes_recipe.text,
+        coalesce((
+            SELECT group_concat(ingredients_ingredient.name, ' ')
+            FROM recipes_recipeingredient
+            JOIN ingredients_ingredient
+                ON ingredients_ingredient.id
+                = recipes_recipeingredient.ingredient_id
+            WHERE recipes_recipeingredient.recipe_id = recipes_recipe.id
+        ), '')
+    FROM recipes_recipe WHERE recipes_recipe.id IN ({})
+'''
+
+POSTGRESQL_MATCH_SQL = (
+    f"recipes_recipe.search_vector @@ "
+    f"websearch_to_tsquery('{SEARCH_CONFIG}', %s)"
+)
+
+POSTGRESQL_RANK_SQL = (
+    f"ts_rank(recipes_recipe.search_vector, "
+    f"websearch_to_tsquery('{SEARCH_CONFIG}', %s))"
+)
+
+SQLITE_MATCH_SQL = (
+    'SELECT rowid FROM recipes_recipe_fts WHERE recipes_recipe_fts MATCH %s'
+)
+
+SQLITE_RANK_SQL = (
+    '(SELECT -bm25(recipes_recipe_fts, 10.0, 1.0, 5.0) '
+    'FROM recipes_recipe_fts WHERE recipes_recipe_fts MATCH %s '
+    'AND recipes_recipe_fts.rowid = recipes_recipe.id)'
+)
+
+
+def update_search_documents(recipe_ids):
+    """Пересборка поисковых документов рецептов."""
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(POSTGRESQL_UPDATE_SQL, (recipe_ids,))
+            return
+        placeholders = ', '.join(['%s'] * len(recipe_ids))
+        cursor.execute(SQLITE_DELETE_SQL.format(placeholders), recipe_ids)
+        cursor.execute(SQLITE_INSERT_SQL.format(placeholders), recipe_ids)
+
+
+def search_recipes(queryset, query):
+    """Рецепты, подходящие под запрос, упорядоченные по релевантности."""
+    words = re.findall(r'\w+', query)
+    if not words:
+        return queryset
+    if connection.vendor == 'postgresql':
+        return queryset.filter(
+            RawSQL(POSTGRESQL_MATCH_SQL, (query,), BooleanField())
+        ).annotate(
+            search_rank=RawSQL(POSTGRESQL_RANK_SQL, (query,), FloatField())
+        ).order_by('-search_rank', *queryset.model._meta.ordering)
+    match = ' '.join(f'"{word}"*' for word in words)
+    return queryset.filter(
+        id__in=RawSQL(SQLITE_MATCH_SQL, (match,))
+    ).annotate(
+        search_rank=RawSQL(SQLITE_RANK_SQL, (match,), FloatField())
+    ).order_by('-search_rank', *queryset.model._meta.ordering)
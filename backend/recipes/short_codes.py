@@ -0,0 +1,77 @@
+"""Короткие коды рецептов.
+
+Код выводится из id рецепта: id перемешивается ключевой сетью Фейстеля
+на SHORT_CODE_BITS битах и записывается в base62 строкой длины
+SHORT_CODE_LENGTH. Перестановка обратима, поэтому id восстанавливается
+из кода без обращения к базе данных, а коды разных рецептов не
+совпадают. Ключ перестановки задается настройкой SHORT_CODE_KEY.
+"""
+import hashlib
+import hmac
+import string
+
+from django.conf import settings
+
+from foodgram_backend.constants import (SHORT_CODE_BITS, SHORT_CODE_LENGTH,
+                                        SHORT_CODE_ROUNDS)
+
+ALPHABET = string.digits + string.ascii_letters
+
+HALF_BITS = SHORT_CODE_BITS // 2
+
+HALF_MASK = (1 << HALF_BITS) - 1
+
+
+def round_function(round_number, value):
+    """Раундовая функция сети Фейстеля на основе HMAC-SHA256."""
+    digest = hmac.new(
+        settings.SHORT_CODE_KEY.encode(),
+        bytes((round_number,)) + value.to_bytes(4, 'big'),
+        hashlib.sha256
+    ).digest()
+    return int.from_bytes(digest[:4], 'big') & HALF_MASK
+
+
+def permute(value):
+    """Прямая перестановка числа из SHORT_CODE_BITS бит."""
+    left, right = value >> HALF_BITS, value & HALF_MASK
+    for round_number in range(SHORT_CODE_ROUNDS):
+        left, right = right, left ^ round_function(round_number, right)
+    return (left << HALF_BITS) | right
+
+
+def unpermute(value):
+    """Обратная перестановка числа из SHORT_CODE_BITS бит."""
+    left, right = value >> HALF_BITS, value & HALF_MASK
+    for round_number in reversed(range(SHORT_CODE_ROUNDS)):
+        left, right = right ^ round_function(round_number, left), left
+    return (left << HALF_BITS) | right
+
+
+def encode_short_code(recipe_id):
+    """Короткий код рецепта по его id."""
+    value = permute(recipe_id)
+    chars = []
+    for _ in range(SHORT_CODE_LENGTH):
+        value, index = divmod(value, len(ALPHABET))
+        chars.append(ALPHABET[index])
+    return ''.join(reversed(chars))
+
+
+def decode_short_code(code):
+    """Id рецепта по короткому коду или None для кода другого вида.
+
+    None возвращается, в частности, для случайных кодов длины
+    SHORT_CODE_MAX_LENGTH, выданных до перехода на выводимые коды.
+    """
+    if len(code) != SHORT_CODE_LENGTH:
+        return None
+    value = 0
+    for char in code:
+        index = ALPHABET.find(char)
+        if index < 0:
+            return None
+        value = value * len(ALPHABET) + index
+    if value >> SHORT_CODE_BITS:
+        return None
+    return unpermute(value)
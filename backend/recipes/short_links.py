@@ -0,0 +1,82 @@
+"""Разрешение коротких ссылок рецептов.
+
+Соответствие кода и id рецепта хранится в ограниченном LRU-словаре
+процесса и в общем кеше, поэтому повторные переходы по ссылке не
+обращаются к базе данных. При удалении рецепта его коды удаляются из
+общего кеша, а словари всех процессов сбрасываются сменой версии.
+"""
+from collections import OrderedDict
+
+from django.core.cache import cache
+
+from foodgram_backend.constants import (SHORT_LINK_CACHE_KEY,
+                                        SHORT_LINK_CACHE_TIMEOUT,
+                                        SHORT_LINK_LRU_SIZE)
+from foodgram_backend.indexes import LocalIndex
+from recipes.models import Recipe
+from recipes.short_codes import decode_short_code, encode_short_code
+
+
+class ShortLinkCache(LocalIndex):
+    """LRU-словарь код -> id рецепта с общей версией в кеше."""
+
+    version_key = 'recipes:short_links:version'
+    max_size = SHORT_LINK_LRU_SIZE
+
+    def build(self):
+        """Пустой словарь; заполняется при переходах по ссылкам."""
+        return OrderedDict()
+
+    @staticmethod
+    def lookup(code):
+        """Id рецепта по коду из базы данных или None.
+
+        Код, выведенный из id текущим ключом, принимается, только если он
+        совпадает с сохраненным кодом рецепта или код еще не сохранен.
+        Иначе код выдан с другим ключом или до перехода на выводимые
+        коды, и рецепт ищется по сохраненному коду.
+        """
+        recipe_id = decode_short_code(code)
+        if recipe_id is not None:
+            recipe = Recipe.objects.filter(pk=recipe_id).values_list(
+                'id', 'short_code'
+            ).first()
+            if recipe is not None and recipe[1] in (code, None, ''):
+                return recipe[0]
+        return Recipe.objects.filter(short_code=code).values_list(
+            'id', flat=True
+        ).first()
+
+    def resolve(self, code):
+        """Id рецепта по короткому коду или None, если рецепта нет."""
+        links = self.get()
+        with self._lock:
+            recipe_id = links.get(code)
+            if recipe_id is not None:
+                links.move_to_end(code)
+                return recipe_id
+        key = SHORT_LINK_CACHE_KEY.format(code)
+        recipe_id = cache.get(key)
+        if recipe_id is None:
+            recipe_id = self.lookup(code)
+            if recipe_id is None:
+                return None
+            cache.set(key, recipe_id, SHORT_LINK_CACHE_TIMEOUT)
+        with self._lock:
+            links[code] = recipe_id
+            if len(links) > self.max_size:
+                links.popitem(last=False)
+        return recipe_id
+
+    def forget(self, recipe):
+        """Удаление кодов рецепта из общего кеша и словарей процессов."""
+        codes = {encode_short_code(recipe.pk)}
+        if recipe.short_code:
+            codes.add(recipe.short_code)
+        cache.delete_many(
+            [SHORT_LINK_CACHE_KEY.format(code) for code in codes]
+        )
+        self.invalidate()
+
+
+short_links = ShortLinkCache()
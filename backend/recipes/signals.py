@@ -0,0 +1,15 @@
+"""Сигналы приложения recipes."""
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from foodgram_backend.images import image_derivatives
+from recipes.models import Recipe
+from recipes.short_links import short_links
+
+image_derivatives.register(Recipe, 'image', 'image_derivatives')
+
+
+@receiver(post_delete, sender=Recipe)
+def forget_short_links(instance, **kwargs):
+    """Сброс закешированных коротких ссылок удаленного рецепта."""
+    short_links.forget(instance)
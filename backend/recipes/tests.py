@@ -0,0 +1,250 @@
+"""Тесты приложения recipes."""
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from favorite.models import Favorite
+from foodgram_backend.constants import SHORT_CODE_BITS, SHORT_CODE_LENGTH
+from recipes.models import Recipe
+from recipes.short_codes import (ALPHABET, decode_short_code,
+                                 encode_short_code, permute, unpermute)
+from recipes.short_links import ShortLinkCache
+from recipes.user_lists import add_recipes, remove_recipes
+from shopping_cart.models import ShoppingCart
+
+User = get_user_model()
+
+
+class UserListsTests(TestCase):
+    """Добавление рецептов в списки пользователя и удаление из них."""
+
+    @classmethod
+    def setUpTestData(cls):
+        """Автор, пользователь и два рецепта."""
+        cls.author = User.objects.create_user(
+            email='author@foodgram.ru', username='author',
+            first_name='Автор', last_name='Рецептов', password='password'
+        )
+        cls.user = User.objects.create_user(
+            email='user@foodgram.ru', username='user',
+            first_name='Пользователь', last_name='Списков',
+            password='password'
+        )
+        cls.recipes = [
+            Recipe.objects.create(
+                author=cls.author, name=f'Рецепт {number}', text='Текст',
+                image=f'recipes/{number}.png', cooking_time=number
+            )
+            for number in (1, 2)
+        ]
+        cls.recipe_ids = [recipe.id for recipe in cls.recipes]
+        cls.missing_id = max(cls.recipe_ids) + 1
+
+    def get_counts(self, field):
+        """Значения счетчика field рецептов."""
+        return list(Recipe.objects.filter(
+            id__in=self.recipe_ids
+        ).order_by('id').values_list(field, flat=True))
+
+    def test_add(self):
+        """Добавление создает связи, увеличивает счетчики и отдает карточки."""
+        result = add_recipes(
+            Favorite, self.user, self.recipe_ids, 'favorites_count'
+        )
+        self.assertEqual(set(result), set(self.recipe_ids))
+        for recipe in self.recipes:
+            card, created = result[recipe.id]
+            self.assertTrue(created)
+            self.assertEqual(card.name, recipe.name)
+            self.assertEqual(card.image.name, recipe.image.name)
+            self.assertEqual(card.cooking_time, recipe.cooking_time)
+            self.assertEqual(
+                card.image_derivatives, recipe.image_derivatives
+            )
+        self.assertEqual(
+            set(Favorite.objects.filter(user=self.user).values_list(
+                'recipe_id', flat=True
+            )),
+            set(self.recipe_ids)
+        )
+        self.assertEqual(self.get_counts('favorites_count'), [1, 1])
+        self.assertEqual(self.get_counts('in_carts_count'), [0, 0])
+
+    def test_duplicate_add(self):
+        """Повторное добавление не меняет связи и счетчики."""
+        add_recipes(
+            ShoppingCart, self.user, self.recipe_ids[:1], 'in_carts_count'
+        )
+        result = add_recipes(
+            ShoppingCart, self.user, self.recipe_ids, 'in_carts_count'
+        )
+        self.assertFalse(result[self.recipe_ids[0]][1])
+        self.assertTrue(result[self.recipe_ids[1]][1])
+        self.assertEqual(
+            ShoppingCart.objects.filter(user=self.user).count(), 2
+        )
+        self.assertEqual(self.get_counts('in_carts_count'), [1, 1])
+
+    def test_add_missing(self):
+        """Отсутствующие рецепты не добавляются и не попадают в результат."""
+        result = add_recipes(
+            Favorite, self.user, (self.missing_id,), 'favorites_count'
+        )
+        self.assertEqual(result, {})
+        self.assertFalse(Favorite.objects.exists())
+
+    def test_remove(self):
+        """Удаление убирает связи и уменьшает счетчики удаленных."""
+        add_recipes(Favorite, self.user, self.recipe_ids, 'favorites_count')
+        result = remove_recipes(
+            Favorite, self.user, (*self.recipe_ids[:1], self.missing_id),
+            'favorites_count'
+        )
+        self.assertEqual(result, {self.recipe_ids[0]: True})
+        self.assertEqual(
+            list(Favorite.objects.filter(user=self.user).values_list(
+                'recipe_id', flat=True
+            )),
+            self.recipe_ids[1:]
+        )
+        self.assertEqual(self.get_counts('favorites_count'), [0, 1])
+
+    def test_remove_absent(self):
+        """Удаление рецепта не из списка не меняет счетчики."""
+        add_recipes(
+            ShoppingCart, self.author, self.recipe_ids, 'in_carts_count'
+        )
+        result = remove_recipes(
+            ShoppingCart, self.user, self.recipe_ids, 'in_carts_count'
+        )
+        self.assertEqual(result, dict.fromkeys(self.recipe_ids, False))
+        self.assertEqual(ShoppingCart.objects.count(), 2)
+        self.assertEqual(self.get_counts('in_carts_count'), [1, 1])
+
+    def test_counter_not_negative(self):
+        """Счетчик не уменьшается ниже нуля."""
+        Favorite.objects.create(user=self.user, recipe=self.recipes[0])
+        result = remove_recipes(
+            Favorite, self.user, self.recipe_ids[:1], 'favorites_count'
+        )
+        self.assertEqual(result, {self.recipe_ids[0]: True})
+        self.assertEqual(self.get_counts('favorites_count'), [0, 0])
+
+    def test_empty(self):
+        """Пустой набор рецептов не меняет списки."""
+        self.assertEqual(
+            add_recipes(Favorite, self.user, (), 'favorites_count'), {}
+        )
+        self.assertEqual(
+            remove_recipes(Favorite, self.user, (), 'favorites_count'), {}
+        )
+
+
+class ShortCodeTests(SimpleTestCase):
+    """Выведение коротких кодов из id рецептов."""
+
+    sample_ids = (
+        *range(1, 2000), 123456, 10 ** 9, 2 ** SHORT_CODE_BITS - 1
+    )
+
+    def test_permutation_is_reversible(self):
+        """Обратная перестановка восстанавливает число."""
+        for value in (0, *self.sample_ids):
+            self.assertEqual(unpermute(permute(value)), value)
+
+    def test_round_trip(self):
+        """Id восстанавливается из кода, коды разных id различны."""
+        codes = set()
+        for recipe_id in self.sample_ids:
+            code = encode_short_code(recipe_id)
+            self.assertEqual(len(code), SHORT_CODE_LENGTH)
+            self.assertTrue(set(code) <= set(ALPHABET))
+            self.assertEqual(decode_short_code(code), recipe_id)
+            codes.add(code)
+        self.assertEqual(len(codes), len(self.sample_ids))
+
+    def test_key(self):
+        """Коды зависят от ключа SHORT_CODE_KEY."""
+        code = encode_short_code(1)
+        with override_settings(SHORT_CODE_KEY='another-key'):
+            self.assertNotEqual(encode_short_code(1), code)
+            self.assertEqual(decode_short_code(encode_short_code(1)), 1)
+
+    def test_foreign_codes(self):
+        """Коды другой длины, с чужими символами и вне диапазона - None."""
+        for code in ('AbCdEf12', 'abc', 'abc-def', 'zzzzzzz'):
+            with self.subTest(code=code):
+                self.assertIsNone(decode_short_code(code))
+
+
+class ShortLinkTests(TestCase):
+    """Разрешение коротких ссылок рецептов."""
+
+    legacy_code = 'LegacyAb'
+
+    @classmethod
+    def setUpTestData(cls):
+        """Рецепт с выведенным кодом и рецепт с прежним кодом."""
+        author = User.objects.create_user(
+            email='author@foodgram.ru', username='author',
+            first_name='Автор', last_name='Рецептов', password='password'
+        )
+        cls.recipe, cls.legacy_recipe = (
+            Recipe.objects.create(
+                author=author, name=f'Рецепт {number}', text='Текст',
+                image=f'recipes/{number}.png', cooking_time=1
+            )
+            for number in (1, 2)
+        )
+        Recipe.objects.filter(pk=cls.legacy_recipe.pk).update(
+            short_code=cls.legacy_code
+        )
+
+    def test_derived_code(self):
+        """Новый рецепт сохраняет код, выведенный из id."""
+        self.recipe.refresh_from_db()
+        self.assertEqual(
+            self.recipe.short_code, encode_short_code(self.recipe.pk)
+        )
+        self.assertEqual(
+            ShortLinkCache.lookup(self.recipe.short_code), self.recipe.pk
+        )
+
+    def test_legacy_code(self):
+        """Прежний код из 8 символов находится по сохраненному коду."""
+        self.assertEqual(
+            ShortLinkCache.lookup(self.legacy_code), self.legacy_recipe.pk
+        )
+        self.assertEqual(
+            ShortLinkCache().resolve(self.legacy_code), self.legacy_recipe.pk
+        )
+
+    def test_derived_code_of_legacy_recipe(self):
+        """Выведенный код не подменяет сохраненный прежний код."""
+        self.assertIsNone(
+            ShortLinkCache.lookup(encode_short_code(self.legacy_recipe.pk))
+        )
+
+    def test_unsaved_code(self):
+        """Выведенный код рецепта без сохраненного кода принимается."""
+        Recipe.objects.filter(pk=self.recipe.pk).update(short_code=None)
+        self.assertEqual(
+            ShortLinkCache.lookup(encode_short_code(self.recipe.pk)),
+            self.recipe.pk
+        )
+
+    def test_missing_recipe(self):
+        """Код несуществующего рецепта не разрешается."""
+        missing_id = self.legacy_recipe.pk + 1
+        self.assertIsNone(
+            ShortLinkCache.lookup(encode_short_code(missing_id))
+        )
+        self.assertIsNone(ShortLinkCache().resolve('Missing1'))
+
+    def test_redirect(self):
+        """Короткая ссылка перенаправляет на страницу рецепта."""
+        response = self.client.get(f'/s/{self.legacy_code}/')
+        self.assertRedirects(
+            response, f'/recipes/{self.legacy_recipe.pk}/',
+            fetch_redirect_response=False
+        )
+        self.assertEqual(self.client.get('/s/Missing1/').status_code, 404)
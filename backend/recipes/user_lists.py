@@ -0,0 +1,165 @@
+"""Добавление рецептов в избранное и список покупок и удаление из них.
+
+Запись связи, изменение счетчика рецепта и получение данных карточки
+выполняются одним запросом в PostgreSQL и двумя в SQLite. Повторное
+добавление определяется по ограничению уникальности связи, а не
+предварительной проверкой.
+"""
+from django.db import connection, transaction
+
+from recipes.models import Recipe
+
+CARD_FIELDS = ('id', 'name', 'image', 'cooking_time', 'image_derivatives')
+
+POSTGRESQL_ADD_SQL = '''
+    WITH inserted AS (
+        INSERT INTO {relation} (user_id, recipe_id)
+        SELECT %s, recipes_recipe.id FROM recipes_recipe
+        WHERE recipes_recipe.id = ANY(%s)
+        ON CONFLICT DO NOTHING
+        RETURNING recipe_id
+    ), counted AS (
+        UPDATE recipes_recipe SET {counter} = {counter} + 1
+        FROM inserted WHERE recipes_recipe.id = inserted.recipe_id
+        RETURNING recipes_recipe.id
+    )
+    SELECT {fields}, recipes_recipe.id IN (SELECT id FROM counted)
+    FROM recipes_recipe WHERE recipes_recipe.id = ANY(%s)
+'''
+
+POSTGRESQL_REMOVE_SQL = '''
+    WITH deleted AS (
+        DELETE FROM {relation}
+        WHERE user_id = %s AND recipe_id = ANY(%s)
+        RETURNING recipe_id
+    ), counted AS (
+        UPDATE recipes_recipe SET {counter} = {counter} - 1
+        FROM deleted WHERE recipes_recipe.id = deleted.recipe_id
+        AND recipes_recipe.{counter} > 0
+    )
+    SELECT recipes_recipe.id,
+        recipes_recipe.id IN (SELECT recipe_id FROM deleted)
+    FROM recipes_recipe WHERE recipes_recipe.id = ANY(%s)
+'''
+
+SQLITE_ADD_SQL = '''
+    INSERT INTO {relation} (user_id, recipe_id)
+    SELECT %s, recipes_recipe.id FROM recipes_recipe
+    WHERE recipes_recipe.id IN ({placeholders})
+    ON CONFLICT DO NOTHING
+    RETURNING recipe_id
+'''
+
+SQLITE_COUNT_SQL = '''
+    UPDATE recipes_recipe SET {counter} = {counter} + (
+        recipes_recipe.id IN ({created})
+    )
+    WHERE recipes_recipe.id IN ({placeholders})
+    RETURNING {fields}, recipes_recipe.id IN ({created})
+'''
+
+SQLITE_REMOVE_SQL = '''
+    DELETE FROM {relation}
+    WHERE user_id = %s AND recipe_id IN ({placeholders})
+    RETURNING recipe_id
+'''
+
+SQLITE_UNCOUNT_SQL = '''
+    UPDATE recipes_recipe SET {counter} = {counter} - (
+        recipes_recipe.id IN ({deleted}) AND recipes_recipe.{counter} > 0
+    )
+    WHERE recipes_recipe.id IN ({placeholders})
+    RETURNING recipes_recipe.id, recipes_recipe.id IN ({deleted})
+'''
+
+
+def get_placeholders(values):
+    """Список параметров запроса для условия IN."""
+    return ', '.join(['%s'] * len(values))
+
+
+def get_card(row):
+    """Рецепт с полями карточки из строки результата запроса."""
+    values = dict(zip(CARD_FIELDS, row))
+    values['image_derivatives'] = Recipe._meta.get_field(
+        'image_derivatives'
+    ).from_db_value(values['image_derivatives'], None, connection)
+    return Recipe(**values)
+
+
+def add_recipes(model, user, recipe_ids, counter_field):
+    """Добавление рецептов в список пользователя.
+
+    model - модель связи пользователя с рецептом с ограничением
+    уникальности, counter_field - счетчик рецепта, увеличиваемый для
+    добавленных рецептов. Возвращает словарь id -> (рецепт с полями
+    карточки, признак добавления); отсутствующих рецептов в нем нет.
+    """
+    recipe_ids = list(recipe_ids)
+    names = {
+        'relation': model._meta.db_table,
+        'counter': Recipe._meta.get_field(counter_field).column,
+        'fields': ', '.join(
+            f'recipes_recipe.{field}' for field in CARD_FIELDS
+        ),
+        'placeholders': get_placeholders(recipe_ids),
+    }
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                POSTGRESQL_ADD_SQL.format(**names),
+                (user.id, recipe_ids, recipe_ids)
+            )
+            rows = cursor.fetchall()
+    else:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                SQLITE_ADD_SQL.format(**names), (user.id, *recipe_ids)
+            )
+            created = [recipe_id for recipe_id, in cursor.fetchall()]
+            cursor.execute(
+                SQLITE_COUNT_SQL.format(
+                    created=get_placeholders(created), **names
+                ),
+                (*created, *recipe_ids, *created)
+            )
+            rows = cursor.fetchall()
+    return {
+        row[0]: (get_card(row), bool(row[-1]))
+        for row in rows
+    }
+
+
+def remove_recipes(model, user, recipe_ids, counter_field):
+    """Удаление рецептов из списка пользователя.
+
+    Возвращает словарь id -> признак удаления для существующих
+    рецептов; счетчик counter_field уменьшается у удаленных.
+    """
+    recipe_ids = list(recipe_ids)
+    names = {
+        'relation': model._meta.db_table,
+        'counter': Recipe._meta.get_field(counter_field).column,
+        'placeholders': get_placeholders(recipe_ids),
+    }
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                POSTGRESQL_REMOVE_SQL.format(**names),
+                (user.id, recipe_ids, recipe_ids)
+            )
+            rows = cursor.fetchall()
+    else:
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                SQLITE_REMOVE_SQL.format(**names), (user.id, *recipe_ids)
+            )
+            deleted = [recipe_id for recipe_id, in cursor.fetchall()]
+            cursor.execute(
+                SQLITE_UNCOUNT_SQL.format(
+                    deleted=get_placeholders(deleted), **names
+                ),
+                (*deleted, *recipe_ids, *deleted)
+            )
+            rows = cursor.fetchall()
+    return {recipe_id: bool(removed) for recipe_id, removed in rows}
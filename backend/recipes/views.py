@@ -0,0 +1,20 @@
+"""Представления приложения recipes."""
+from django.http import Http404, HttpResponseRedirect
+from django.views.decorators.http import require_safe
+
+from recipes.analytics import hit_counter
+from recipes.short_links import short_links
+
+
+@require_safe
+def short_recipe_url(request, encoded):
+    """Переход на страницу рецепта по короткой ссылке.
+
+    Обычное представление Django без аутентификации и согласования
+    формата DRF: id рецепта берется из кеша коротких ссылок.
+    """
+    recipe_id = short_links.resolve(encoded)
+    if recipe_id is None:
+        raise Http404
+    hit_counter.record(recipe_id, 'short_link_clicks')
+    return HttpResponseRedirect(f'/recipes/{recipe_id}/')
@@ -0,0 +1,16 @@
+"""Админ-зона приложения tasks."""
+from django.contrib import admin
+
+from tasks.models import Task
+
+
+class TaskAdmin(admin.ModelAdmin):
+    """Модель админ-зоны Task."""
+
+    list_display = ('id', 'name', 'status', 'attempts', 'run_at')
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'key')
+    list_display_links = ('name',)
+
+
+admin.site.register(Task, TaskAdmin)
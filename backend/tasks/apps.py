@@ -0,0 +1,10 @@
+"""Настройки приложения tasks."""
+from django.apps import AppConfig
+
+
+class TasksConfig(AppConfig):
+    """Класс настроек приложения tasks."""
+
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'tasks'
+    verbose_name = 'Фоновые задачи'
@@ -0,0 +1,43 @@
+"""Запуск обработчиков фоновых задач."""
+import signal
+
+from django.core.management.base import BaseCommand
+
+from foodgram_backend.constants import TASK_WORKER_THREADS
+from tasks.worker import Worker, run_pending
+
+
+class Command(BaseCommand):
+    """Выполнение задач из очереди до получения SIGTERM или SIGINT."""
+
+    help = (
+        'Выполняет фоновые задачи из очереди в нескольких потоках. '
+        'С --burst выполняет имеющиеся задачи и завершается.'
+    )
+
+    def add_arguments(self, parser):
+        """Аргументы команды."""
+        parser.add_argument(
+            '--threads', type=int, default=TASK_WORKER_THREADS,
+            help='Число потоков обработки задач.'
+        )
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Выполнить имеющиеся задачи и завершиться.'
+        )
+
+    def handle(self, *args, **options):
+        """Запуск обработчиков."""
+        if options['burst']:
+            count = run_pending()
+            self.stdout.write(self.style.SUCCESS(
+                f'Выполнено задач: {count}.'
+            ))
+            return
+        worker = Worker(options['threads'])
+        signal.signal(signal.SIGTERM, worker.stop)
+        signal.signal(signal.SIGINT, worker.stop)
+        self.stdout.write(
+            f'Запущено обработчиков задач: {options["threads"]}.'
+        )
+        worker.run()
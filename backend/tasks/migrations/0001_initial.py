@@ -0,0 +1,37 @@
+# Generated by Django 5.1.7 on 2026-10-18 20:26
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Task',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, verbose_name='Функция')),
+                ('arguments', models.JSONField(default=list, verbose_name='Аргументы')),
+                ('key', models.CharField(blank=True, max_length=255, null=True, verbose_name='Ключ идемпотентности')),
+                ('status', models.CharField(choices=[('pending', 'Ожидает'), ('running', 'Выполняется'), ('failed', 'Завершилась ошибкой')], default='pending', max_length=16, verbose_name='Статус')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Попыток')),
+                ('run_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Время запуска')),
+                ('locked_until', models.DateTimeField(blank=True, null=True, verbose_name='Выполняется до')),
+                ('error', models.TextField(blank=True, verbose_name='Последняя ошибка')),
+                ('date_created', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+            ],
+            options={
+                'verbose_name': 'Фоновая задача',
+                'verbose_name_plural': 'Фоновые задачи',
+                'ordering': ('run_at', 'id'),
+                'indexes': [models.Index(fields=['status', 'run_at'], name='task_status_run_at_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('status', 'pending')), fields=('name', 'key'), name='unique_pending_task_key')],
+            },
+        ),
+    ]
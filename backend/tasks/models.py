@@ -0,0 +1,73 @@
+"""Модели tasks."""
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+from foodgram_backend.constants import (TASK_KEY_MAX_LENGTH,
+                                        TASK_NAME_MAX_LENGTH,
+                                        TASK_STATUS_MAX_LENGTH)
+
+
+class Task(models.Model):
+    """Фоновая задача в очереди.
+
+    Успешно выполненные задачи удаляются, задачи, исчерпавшие попытки,
+    остаются со статусом failed и текстом последней ошибки.
+    """
+
+    class Status(models.TextChoices):
+        """Статусы задачи."""
+
+        PENDING = 'pending', 'Ожидает'
+        RUNNING = 'running', 'Выполняется'
+        FAILED = 'failed', 'Завершилась ошибкой'
+
+    name = models.CharField(
+        max_length=TASK_NAME_MAX_LENGTH, verbose_name='Функция'
+    )
+    arguments = models.JSONField(default=list, verbose_name='Аргументы')
+    key = models.CharField(
+        max_length=TASK_KEY_MAX_LENGTH, null=True, blank=True,
+        verbose_name='Ключ идемпотентности'
+    )
+    status = models.CharField(
+        max_length=TASK_STATUS_MAX_LENGTH,
+        choices=Status.choices, default=Status.PENDING,
+        verbose_name='Статус'
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0, verbose_name='Попыток'
+    )
+    run_at = models.DateTimeField(
+        default=timezone.now, verbose_name='Время запуска'
+    )
+    locked_until = models.DateTimeField(
+        null=True, blank=True, verbose_name='Выполняется до'
+    )
+    error = models.TextField(blank=True, verbose_name='Последняя ошибка')
+    date_created = models.DateTimeField(
+        auto_now_add=True, verbose_name='Дата создания'
+    )
+
+    class Meta:
+        """Мета-информация Task."""
+
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        ordering = ('run_at', 'id')
+        constraints = (
+            models.UniqueConstraint(
+                fields=('name', 'key'),
+                condition=Q(status='pending'),
+                name='unique_pending_task_key'
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('status', 'run_at'), name='task_status_run_at_idx'
+            ),
+        )
+
+    def __str__(self):
+        """Строковое представление задачи."""
+        return f'{self.name} ({self.get_status_display()})'
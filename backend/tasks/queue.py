@@ -0,0 +1,76 @@
+"""Очередь фоновых задач в базе данных.
+
+Задача - функция модуля, отмеченная декоратором task. Постановка в
+очередь записывает строку Task в текущей транзакции, поэтому задача
+видна обработчикам только после фиксации изменений, для которых она
+создана. Задачи выполняет команда run_workers; при TASKS_EAGER они
+выполняются в текущем процессе после фиксации транзакции.
+"""
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from foodgram_backend.constants import TASK_MAX_ATTEMPTS, TASK_RETRY_DELAY
+from tasks.models import Task
+
+
+def task(max_attempts=TASK_MAX_ATTEMPTS, concurrency=None,
+         retry_delay=TASK_RETRY_DELAY, atomic=False):
+    """Декоратор функции фоновой задачи.
+
+    max_attempts - число попыток выполнения, concurrency - наибольшее
+    число одновременно выполняемых задач функции, retry_delay - задержка
+    первого повтора в секундах, каждая следующая вдвое больше. При atomic
+    изменения функции фиксируются вместе с удалением задачи, поэтому
+    задача не применяется повторно. Функция получает метод enqueue; ее
+    аргументы должны сериализоваться в JSON.
+    """
+    def decorator(function):
+        function.task_options = {
+            'max_attempts': max_attempts,
+            'concurrency': concurrency,
+            'retry_delay': retry_delay,
+            'atomic': atomic,
+        }
+        function.enqueue = partial(enqueue, function)
+        return function
+    return decorator
+
+
+def get_task_name(function):
+    """Путь импорта функции задачи."""
+    return f'{function.__module__}.{function.__qualname__}'
+
+
+def get_task_function(name):
+    """Функция задачи по пути импорта или None.
+
+    Выполняются только функции, отмеченные декоратором task.
+    """
+    try:
+        function = import_string(name)
+    except ImportError:
+        return None
+    return function if hasattr(function, 'task_options') else None
+
+
+def enqueue(function, *args, key=None, delay=0):
+    """Постановка задачи в очередь.
+
+    Задача с ключом key не создается, если такая же задача с этим
+    ключом еще ожидает выполнения.
+    """
+    if settings.TASKS_EAGER:
+        transaction.on_commit(partial(function, *args))
+        return
+    Task.objects.bulk_create(
+        (Task(
+            name=get_task_name(function), arguments=list(args), key=key,
+            run_at=timezone.now() + timedelta(seconds=delay)
+        ),),
+        ignore_conflicts=key is not None
+    )
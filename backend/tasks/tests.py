@@ -0,0 +1,147 @@
+"""Тесты приложения tasks."""
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from tasks.models import Task
+from tasks.queue import get_task_name, task
+from tasks.worker import claim, execute
+
+calls = []
+
+
+@task()
+def record(value):
+    """Задача, запоминающая аргумент."""
+    calls.append(value)
+
+
+@task(max_attempts=2, retry_delay=10)
+def fail():
+    """Задача, завершающаяся ошибкой."""
+    raise ValueError('Ошибка задачи')
+
+
+@task(atomic=True)
+def change():
+    """Задача, изменения которой фиксируются вместе с ее удалением."""
+    record.enqueue('изменение')
+
+
+@task(concurrency=1)
+def limited():
+    """Задача с ограничением одновременного выполнения."""
+
+
+@override_settings(TASKS_EAGER=False)
+class WorkerTests(TestCase):
+    """Захват, выполнение и повтор задач обработчиком."""
+
+    def setUp(self):
+        """Пустой список вызовов задач."""
+        calls.clear()
+
+    def expire(self, **filters):
+        """Перенос сроков задач в прошлое."""
+        past = timezone.now() - timedelta(seconds=1)
+        Task.objects.filter(**filters).update(run_at=past, locked_until=past)
+
+    def test_claim_and_execute(self):
+        """Задача захватывается один раз и удаляется после выполнения."""
+        record.enqueue('значение')
+        claimed_task, function = claim()
+        self.assertIs(function, record)
+        self.assertEqual(claimed_task.attempts, 1)
+        stored = Task.objects.get()
+        self.assertEqual(stored.status, Task.Status.RUNNING)
+        self.assertEqual(stored.attempts, 1)
+        self.assertGreater(stored.locked_until, timezone.now())
+        self.assertIsNone(claim())
+        execute(claimed_task, function)
+        self.assertEqual(calls, ['значение'])
+        self.assertFalse(Task.objects.exists())
+
+    def test_delay(self):
+        """Отложенная задача не захватывается до времени запуска."""
+        record.enqueue('значение', delay=60)
+        self.assertIsNone(claim())
+        self.expire()
+        self.assertIsNotNone(claim())
+
+    def test_expired_lease(self):
+        """Задачу с истекшим сроком захватывает другой обработчик."""
+        record.enqueue('значение')
+        stale = claim()
+        self.expire()
+        claimed_task, function = claim()
+        self.assertEqual(claimed_task.attempts, 2)
+        execute(*stale)
+        self.assertTrue(Task.objects.filter(attempts=2).exists())
+        execute(claimed_task, function)
+        self.assertEqual(calls, ['значение', 'значение'])
+        self.assertFalse(Task.objects.exists())
+
+    def test_atomic(self):
+        """Изменения atomic-задачи фиксируются вместе с ее удалением."""
+        change.enqueue()
+        execute(*claim())
+        stored = Task.objects.get()
+        self.assertEqual(stored.name, get_task_name(record))
+        self.assertEqual(stored.arguments, ['изменение'])
+
+    def test_atomic_lease_expired(self):
+        """Изменения atomic-задачи откатываются, если ее захватили снова."""
+        change.enqueue()
+        stale = claim()
+        self.expire()
+        claim()
+        execute(*stale)
+        stored = Task.objects.get()
+        self.assertEqual(stored.name, get_task_name(change))
+        self.assertEqual(stored.attempts, 2)
+        self.assertEqual(stored.status, Task.Status.RUNNING)
+
+    def test_retry(self):
+        """Ошибка откладывает повтор, последняя попытка помечает failed."""
+        fail.enqueue()
+        start = timezone.now()
+        execute(*claim())
+        stored = Task.objects.get()
+        self.assertEqual(stored.status, Task.Status.PENDING)
+        self.assertIsNone(stored.locked_until)
+        self.assertIn('ValueError', stored.error)
+        self.assertGreaterEqual(stored.run_at, start + timedelta(seconds=10))
+        self.assertIsNone(claim())
+        self.expire()
+        execute(*claim())
+        stored = Task.objects.get()
+        self.assertEqual(stored.status, Task.Status.FAILED)
+        self.assertEqual(stored.attempts, 2)
+        self.assertIsNone(stored.locked_until)
+
+    def test_retry_with_pending_key(self):
+        """Повтор не создается, если задача с ключом уже ожидает."""
+        fail.enqueue(key='ключ')
+        claimed = claim()
+        fail.enqueue(key='ключ')
+        fail.enqueue(key='ключ')
+        execute(*claimed)
+        stored = Task.objects.get()
+        self.assertEqual(stored.status, Task.Status.PENDING)
+        self.assertEqual(stored.attempts, 0)
+
+    def test_unknown_function(self):
+        """Задача неизвестной функции помечается failed."""
+        Task.objects.create(name='tasks.tests.missing')
+        self.assertIsNone(claim())
+        stored = Task.objects.get()
+        self.assertEqual(stored.status, Task.Status.FAILED)
+        self.assertIn('tasks.tests.missing', stored.error)
+
+    def test_concurrency(self):
+        """Задача не захватывается сверх ограничения concurrency."""
+        limited.enqueue()
+        limited.enqueue()
+        self.assertIsNotNone(claim())
+        self.assertIsNone(claim())
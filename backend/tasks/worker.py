@@ -0,0 +1,163 @@
+"""Обработчик фоновых задач.
+
+Задача захватывается условным UPDATE по статусу и числу попыток, поэтому
+ее выполняет только один поток любого процесса. Захваченная задача
+получает срок TASK_LEASE_TIMEOUT: задачу обработчика, завершившегося
+во время выполнения, по истечении срока захватит другой обработчик.
+Ограничение одновременного выполнения проверяется перед захватом, и при
+гонке обработчиков может быть кратковременно превышено.
+"""
+import threading
+import traceback
+from contextlib import nullcontext
+from datetime import timedelta
+
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from foodgram_backend.constants import (TASK_CLAIM_BATCH_SIZE,
+                                        TASK_LEASE_TIMEOUT, TASK_POLL_INTERVAL)
+from tasks.models import Task
+from tasks.queue import get_task_function
+
+
+def claim():
+    """Захват готовой к выполнению задачи.
+
+    Возвращает задачу и ее функцию или None, если задач нет.
+    """
+    now = timezone.now()
+    candidates = Task.objects.filter(
+        Q(status=Task.Status.PENDING, run_at__lte=now)
+        | Q(status=Task.Status.RUNNING, locked_until__lt=now)
+    )[:TASK_CLAIM_BATCH_SIZE]
+    saturated = set()
+    for task in candidates:
+        if task.name in saturated:
+            continue
+        function = get_task_function(task.name)
+        if function is None:
+            Task.objects.filter(pk=task.pk).update(
+                status=Task.Status.FAILED, locked_until=None,
+                error=f'Функция задачи {task.name} не найдена.'
+            )
+            continue
+        limit = function.task_options['concurrency']
+        if limit is not None and Task.objects.filter(
+            name=task.name, status=Task.Status.RUNNING,
+            locked_until__gte=now
+        ).count() >= limit:
+            saturated.add(task.name)
+            continue
+        claimed = Task.objects.filter(
+            pk=task.pk, status=task.status, attempts=task.attempts
+        ).update(
+            status=Task.Status.RUNNING, attempts=F('attempts') + 1,
+            locked_until=now + timedelta(seconds=TASK_LEASE_TIMEOUT)
+        )
+        if claimed:
+            task.attempts += 1
+            return task, function
+    return None
+
+
+class LeaseExpired(Exception):
+    """Задачу после истечения срока захватил другой обработчик."""
+
+
+def execute(task, function):
+    """Выполнение захваченной задачи и запись результата.
+
+    Успешная задача удаляется. Задача с atomic выполняется и удаляется
+    в одной транзакции: если задачу успел захватить другой обработчик,
+    ее изменения откатываются. После ошибки задача повторяется с
+    удвоением задержки, пока не исчерпаны попытки, и затем помечается
+    как failed. Повтор не создается, если в очереди уже ждет задача с
+    тем же ключом.
+    """
+    options = function.task_options
+    tasks = Task.objects.filter(pk=task.pk, attempts=task.attempts)
+    try:
+        with (
+            transaction.atomic() if options['atomic'] else nullcontext()
+        ):
+            function(*task.arguments)
+            deleted, _ = tasks.delete()
+            if options['atomic'] and not deleted:
+                raise LeaseExpired
+    except LeaseExpired:
+        return
+    except Exception:
+        error = traceback.format_exc()
+    else:
+        return
+    if task.attempts >= options['max_attempts']:
+        tasks.update(
+            status=Task.Status.FAILED, locked_until=None, error=error
+        )
+        return
+    delay = options['retry_delay'] * 2 ** (task.attempts - 1)
+    try:
+        with transaction.atomic():
+            tasks.update(
+                status=Task.Status.PENDING, locked_until=None, error=error,
+                run_at=timezone.now() + timedelta(seconds=delay)
+            )
+    except IntegrityError:
+        tasks.delete()
+
+
+def run_pending():
+    """Выполнение задач, пока они есть; возвращает их число."""
+    count = 0
+    while (claimed := claim()) is not None:
+        execute(*claimed)
+        count += 1
+    return count
+
+
+class Worker:
+    """Потоки, выполняющие задачи из очереди до остановки."""
+
+    def __init__(self, threads):
+        """Обработчик с заданным числом потоков."""
+        self.threads = threads
+        self.stopping = threading.Event()
+
+    def run(self):
+        """Запуск потоков и ожидание их завершения."""
+        workers = [
+            threading.Thread(
+                target=self.loop, name=f'task-worker-{number}', daemon=True
+            )
+            for number in range(self.threads)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            while worker.is_alive():
+                worker.join(TASK_POLL_INTERVAL)
+
+    def stop(self, *args):
+        """Остановка после завершения текущих задач."""
+        self.stopping.set()
+
+    def loop(self):
+        """Цикл потока: выполнение задач и ожидание новых.
+
+        При ошибке базы данных соединение закрывается и открывается
+        заново на следующей итерации.
+        """
+        try:
+            while not self.stopping.is_set():
+                try:
+                    claimed = claim()
+                    if claimed is not None:
+                        execute(*claimed)
+                        continue
+                except DatabaseError:
+                    connection.close()
+                self.stopping.wait(TASK_POLL_INTERVAL)
+        finally:
+            connection.close()
@@ -8,3 +8,10 @@ class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'users'
     verbose_name = 'Пользователи'
+
+    def ready(self):
+        """Подключение уменьшенных копий аватаров."""
+        from foodgram_backend.images import image_derivatives
+        from users.models import User
+
+        image_derivatives.register(User, 'avatar', 'avatar_derivatives')
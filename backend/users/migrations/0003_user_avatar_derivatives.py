@@ -0,0 +1,18 @@
+# Generated by Django 5.1.7 on 2026-10-18 20:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_alter_user_username'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='avatar_derivatives',
+            field=models.JSONField(default=list, editable=False, verbose_name='Уменьшенные копии аватара'),
+        ),
+    ]
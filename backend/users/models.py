@@ -37,6 +37,10 @@ class User(AbstractUser):
         upload_to='avatars/', null=True, blank=True,
         default=None, verbose_name='Аватар'
     )
+    avatar_derivatives = models.JSONField(
+        default=list, editable=False,
+        verbose_name='Уменьшенные копии аватара'
+    )
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
 
@@ -1,2 +1,4 @@
 docker compose -f docker-compose.yml exec backend python manage.py loaddata data/full_data.json
+docker compose -f docker-compose.yml exec backend python manage.py rebuild_search_index
+docker compose -f docker-compose.yml exec backend python manage.py rebuild_feeds
 docker compose -f docker-compose.yml cp data/media backend:/app/
\ No newline at end of file